@@ -0,0 +1,112 @@
+import time
+import threading
+
+from collections import OrderedDict
+
+
+class BaseCache(object):
+    """
+    Interface of the caches used by ``DeliveryChoiceApi``. A cache maps
+    hashable keys to values that expire after *timeout* seconds unless a
+    different timeout is given when setting them. ``get`` returns
+    *default* for missing and expired items.
+    """
+
+    def get(self, key, default=None):
+        raise NotImplementedError()
+
+    def set(self, key, value, timeout=None):
+        raise NotImplementedError()
+
+    def delete(self, key):
+        raise NotImplementedError()
+
+    def clear(self):
+        raise NotImplementedError()
+
+    def __len__(self):
+        raise NotImplementedError()
+
+    def stats(self):
+        """
+        Return a dictionary with at least the number of ``hits``,
+        ``misses``, ``evictions`` and ``entries`` and the ``hit_rate``.
+        """
+        raise NotImplementedError()
+
+
+def get_hit_rate(hits, misses):
+    requests = hits + misses
+    return float(hits) / requests if requests else 0.0
+
+
+class LocMemCache(BaseCache):
+    """
+    Thread-safe in-process cache that holds at most *max_entries* items.
+    Every item expires after *timeout* seconds (unless a different timeout
+    is given when setting it) and the least recently used item is evicted
+    when the cache is full.
+    """
+
+    def __init__(self, max_entries=1024, timeout=300):
+        self.max_entries = max_entries
+        self.timeout = timeout
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _time(self):
+        return time.time()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires, value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+
+            if expires <= self._time():
+                self.misses += 1
+                return default
+
+            # re-insert to mark the item as most recently used
+            self._data[key] = (expires, value)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, timeout=None):
+        if timeout is None:
+            timeout = self.timeout
+
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (self._time() + timeout, value)
+
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._data),
+            'hit_rate': get_hit_rate(self.hits, self.misses),
+        }
@@ -0,0 +1,187 @@
+"""
+Track articles and validate addresses in bulk from the command line::
+
+    auspost track tracking_ids.txt > results.ndjson
+    auspost validate --workers 8 addresses.csv > results.ndjson
+
+Tracking IDs are read one per line, addresses as CSV rows with the columns
+``line1``, ``suburb``, ``state``, ``postcode`` and optionally ``line2``
+and ``country``. The input is read from stdin if no file is given. One
+JSON object per input item is written as soon as its request finishes,
+so inputs of any size are processed in constant memory. The API
+credentials are read from the ``AUSPOST_USERNAME`` and
+``AUSPOST_PASSWORD`` environment variables.
+"""
+import os
+import sys
+import csv
+import json
+import argparse
+
+from datetime import date, datetime
+
+from auspost import common
+from auspost.delivery_choice import DeliveryChoiceApi, Model
+
+
+def to_json_data(value):
+    """ Convert models (and lists of them) to JSON serialisable data. """
+    if isinstance(value, Model):
+        data = {}
+        for name in value.get_field_names():
+            try:
+                data[name] = to_json_data(getattr(value, name))
+            except AttributeError:
+                pass
+        return data
+
+    if isinstance(value, (list, tuple)):
+        return [to_json_data(item) for item in value]
+
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+# error of tracking IDs that the API left out of its response
+MISSING_RESULT_ERROR = {
+    'code': 'MissingResult',
+    'message': "No tracking result returned for the tracking ID"}
+
+
+def get_error_data(exc):
+    if isinstance(exc, common.AusPostException):
+        return {'code': exc.code, 'message': exc.message}
+    return {'code': exc.__class__.__name__, 'message': unicode(exc)}
+
+
+def write_record(output, record):
+    output.write(json.dumps(record, sort_keys=True) + '\n')
+
+
+def read_tracking_ids(input_file):
+    for line in input_file:
+        tracking_id = line.strip()
+        if tracking_id:
+            yield tracking_id.decode('utf-8')
+
+
+def read_addresses(input_file):
+    for row in csv.DictReader(input_file):
+        yield dict(
+            (name, row[name].decode('utf-8'))
+            for name in common.ADDRESS_FIELDS if row.get(name))
+
+
+def track(api, tracking_ids, output, max_workers=4):
+    """
+    Track *tracking_ids* and write a record for each of them to *output*,
+    including an error record for IDs missing from the response. Returns
+    the number of tracking IDs that failed.
+    """
+    errors = 0
+    for chunk, results, exc in api.iter_query_tracking(
+            tracking_ids, max_workers=max_workers):
+        if exc is not None:
+            errors += len(chunk)
+            for tracking_id in chunk:
+                write_record(output, {
+                    'tracking_id': tracking_id,
+                    'error': get_error_data(exc)})
+        else:
+            returned = set()
+            for result in results:
+                returned.add(result.id)
+                write_record(output, {
+                    'tracking_id': result.id,
+                    'result': to_json_data(result)})
+
+            for tracking_id in chunk:
+                if tracking_id not in returned:
+                    errors += 1
+                    write_record(output, {
+                        'tracking_id': tracking_id,
+                        'error': MISSING_RESULT_ERROR})
+        output.flush()
+    return errors
+
+
+def validate(api, addresses, output, max_workers=4):
+    """
+    Validate *addresses* and write a record for each of them to *output*.
+    Returns the number of addresses that failed.
+    """
+    errors = 0
+    for address, result, exc in api.iter_validate_addresses(
+            addresses, max_workers=max_workers):
+        if exc is not None:
+            errors += 1
+            write_record(output, {
+                'address': address, 'error': get_error_data(exc)})
+        else:
+            write_record(output, {
+                'address': address, 'result': to_json_data(result)})
+        output.flush()
+    return errors
+
+
+COMMANDS = {
+    'track': (track, read_tracking_ids),
+    'validate': (validate, read_addresses),
+}
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog='auspost', description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=sorted(COMMANDS))
+    parser.add_argument('input', nargs='?', default='-',
+                        help="input file (default: stdin)")
+    parser.add_argument('-o', '--output', default='-',
+                        help="output file (default: stdout)")
+    parser.add_argument('-w', '--workers', type=int, default=4,
+                        help="number of concurrent requests (default: 4)")
+    parser.add_argument('--timeout', type=float, default=30,
+                        help="request timeout in seconds (default: 30)")
+    parser.add_argument('--url',
+                        help="base URL of the API (default: AusPost)")
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    command, read_input = COMMANDS[args.command]
+
+    api = DeliveryChoiceApi(
+        os.environ.get('AUSPOST_USERNAME'),
+        os.environ.get('AUSPOST_PASSWORD'),
+        pool_maxsize=args.workers, timeout=args.timeout)
+    if args.url:
+        api.url = args.url
+
+    input_file = sys.stdin
+    if args.input != '-':
+        input_file = open(args.input, 'rb')
+    output = sys.stdout
+    if args.output != '-':
+        output = open(args.output, 'w')
+
+    try:
+        errors = command(
+            api, read_input(input_file), output, max_workers=args.workers)
+    finally:
+        api.close()
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output is not sys.stdout:
+            output.close()
+
+    if errors:
+        sys.stderr.write("%d items failed\n" % errors)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
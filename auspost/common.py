@@ -1,6 +1,13 @@
+import re
+import json
 import pytz
+import codecs
 
+from collections import deque
+from datetime import datetime, timedelta
+from itertools import islice
 from dateutil.tz import tzoffset
+from concurrent.futures import ThreadPoolExecutor
 from dateutil import parser as date_parser
 
 
@@ -33,6 +40,25 @@ DELIVERY_CHOICE_ERROR_CODES = {
     1505: "Invalid country",
 }
 
+AUSTRALIAN_STATES = ('ACT', 'NSW', 'NT', 'QLD', 'SA', 'TAS', 'VIC', 'WA')
+
+STATE_ABBREVIATIONS = {
+    'AUSTRALIAN CAPITAL TERRITORY': 'ACT',
+    'NEW SOUTH WALES': 'NSW',
+    'NORTHERN TERRITORY': 'NT',
+    'QUEENSLAND': 'QLD',
+    'SOUTH AUSTRALIA': 'SA',
+    'TASMANIA': 'TAS',
+    'VICTORIA': 'VIC',
+    'WESTERN AUSTRALIA': 'WA',
+}
+
+ADDRESS_FIELDS = ('line1', 'suburb', 'state', 'postcode', 'line2', 'country')
+
+# timezone in which the AusPost business day (e.g. the lodgement date)
+# rolls over.
+AUSPOST_TIMEZONE = pytz.timezone('Australia/Sydney')
+
 DAY_CODES = {
     1: 'Monday',
     2: 'Tuesday',
@@ -63,16 +89,106 @@ class AusPostHttpException(AusPostException):
     pass
 
 
+class AusPostCircuitOpenException(AusPostHttpException):
+
+    def __init__(self, code=503, msg="API unavailable, circuit breaker open"):
+        super(AusPostCircuitOpenException, self).__init__(code, msg)
+
+
+# the ISO 8601 shapes used by the APIs, e.g. '2011-04-11',
+# '2011-09-04T12:14:22+10:00' and '2011-07-29T14:05:50.000+10:00'
+ISO_DATETIME_RE = re.compile(
+    r'^(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6})\d*)?)?)?'
+    r'(Z|[+-]\d{2}(?::?\d{2})?)?$')
+
+TZ_UTC = tzoffset(None, 0)
+
+_utc_offsets = {}
+
+
+def get_utc_offset(tz_str):
+    """
+    Return the ``timedelta`` for an ISO 8601 UTC offset such as ``+10:00``
+    or ``Z``. Offsets are cached as only a handful of them are used.
+    """
+    try:
+        return _utc_offsets[tz_str]
+    except KeyError:
+        pass
+
+    if tz_str == 'Z':
+        offset = timedelta(0)
+    else:
+        digits = tz_str[1:].replace(':', '')
+        offset = timedelta(hours=int(digits[:2]), minutes=int(digits[2:] or 0))
+        if tz_str[0] == '-':
+            offset = -offset
+
+    _utc_offsets[tz_str] = offset
+    return offset
+
+
 def get_aware_utc_datetime(datetime_str):
+    match = ISO_DATETIME_RE.match(datetime_str)
+    if match is None:
+        return parse_aware_utc_datetime(datetime_str)
+
+    year, month, day, hour, minute, second, fraction, tz_str = match.groups()
+    dt = datetime(
+        int(year), int(month), int(day),
+        int(hour or 0), int(minute or 0), int(second or 0),
+        int(fraction.ljust(6, '0')) if fraction else 0)
+
+    if tz_str:
+        dt -= get_utc_offset(tz_str)
+    return dt.replace(tzinfo=pytz.utc)
+
+
+def get_aware_utc_datetimes(datetime_strs):
+    """
+    Convert a list of timestamps in one go. Repeated timestamps, which are
+    common in tracking histories and delivery dates, are only parsed once.
+    """
+    parsed = {}
+    datetimes = []
+    for datetime_str in datetime_strs:
+        try:
+            dt = parsed[datetime_str]
+        except KeyError:
+            dt = parsed[datetime_str] = get_aware_utc_datetime(datetime_str)
+        datetimes.append(dt)
+    return datetimes
+
+
+def parse_aware_utc_datetime(datetime_str):
+    """
+    Generic (and slow) parser for timestamps in formats that are not
+    handled by ``get_aware_utc_datetime`` directly.
+    """
     dt = date_parser.parse(datetime_str)
     if dt.tzinfo:
-        dt = dt.astimezone(tzoffset(None, 0))
+        dt = dt.astimezone(TZ_UTC)
         utc_dt = pytz.utc.normalize(dt)
     else:
         utc_dt = pytz.utc.localize(dt)
     return utc_dt
 
 
+def seconds_until_midnight(tz=AUSPOST_TIMEZONE, now=None):
+    """
+    Return the number of seconds until the next midnight in *tz*, which
+    defaults to the timezone the AusPost business day is based on.
+    """
+    now = now or pytz.utc.localize(datetime.utcnow())
+    local_now = now.astimezone(tz)
+    tomorrow = local_now.date() + timedelta(days=1)
+    midnight = tz.localize(datetime(
+        tomorrow.year, tomorrow.month, tomorrow.day))
+    delta = midnight - local_now
+    return delta.days * 86400 + delta.seconds + delta.microseconds / 1e6
+
+
 def is_valid_postcode(postcode):
     try:
         return bool(int(postcode) > 999)
@@ -80,6 +196,41 @@ def is_valid_postcode(postcode):
         return False
 
 
+def normalize_text(value):
+    if value is None:
+        return None
+    return u" ".join(unicode(value).upper().split()) or None
+
+
+def normalize_address(line1, suburb, state, postcode, line2=None,
+                      country="Australia"):
+    """
+    Return a normalised version of an address as a tuple in the order of
+    ``ADDRESS_FIELDS`` that can be used to identify duplicate addresses.
+    Text is upper-cased with whitespace collapsed, state names are
+    replaced by their abbreviation and postcodes are padded to 4 digits.
+    """
+    state = normalize_text(state)
+    state = STATE_ABBREVIATIONS.get(state, state)
+
+    postcode = normalize_text(postcode)
+    if postcode and postcode.isdigit():
+        postcode = postcode.zfill(4)
+
+    return (normalize_text(line1), normalize_text(suburb), state, postcode,
+            normalize_text(line2), normalize_text(country))
+
+
+def normalize_lane(from_postcode, to_postcode, network_id='01'):
+    """
+    Return a delivery lane as a tuple of unicode strings ``(from_postcode,
+    to_postcode, network_id)``, so that e.g. the lanes ``(3000, 2000)``
+    and ``('3000', '2000', '01')`` are the same.
+    """
+    return tuple(unicode(value).strip()
+                 for value in (from_postcode, to_postcode, network_id))
+
+
 def ensure_list(json):
     """
     Ensure that the *json* passed in is a list and not just a simple
@@ -96,3 +247,108 @@ def ensure_list(json):
         return [json]  # return it as a list
     except AttributeError:
         return json
+
+
+def chunked(iterable, size):
+    """
+    Split *iterable* into lists of at most *size* items. The iterable is
+    consumed lazily, so this works for arbitrarily large inputs.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def bounded_map(func, iterable, max_workers=4):
+    """
+    Call *func* for every item in *iterable* using at most *max_workers*
+    threads and yield ``(item, result, exception)`` tuples in input order.
+    Exceptions raised by *func* are returned instead of raised, so a single
+    failing item does not abort the remaining ones.
+
+    Only a bounded number of items is scheduled ahead of the one that is
+    yielded next, which keeps memory usage constant for very large inputs.
+    """
+    pending = deque()
+    with ThreadPoolExecutor(max_workers) as executor:
+        for item in iterable:
+            pending.append((item, executor.submit(func, item)))
+            if len(pending) >= max_workers * 2:
+                yield _get_future_result(*pending.popleft())
+
+        while pending:
+            yield _get_future_result(*pending.popleft())
+
+
+def _get_future_result(item, future):
+    try:
+        return item, future.result(), None
+    except Exception as exc:
+        return item, None, exc
+
+
+_JSON_SEPARATORS_RE = re.compile(r'[\s,]*')
+_JSON_DELIMITERS = frozenset(u' \t\r\n,]}')
+
+
+def iter_json_array(chunks, key):
+    """
+    Incrementally parse the JSON document read from the iterable of byte
+    *chunks* and yield the items of the list stored under *key* one at a
+    time. Only the current item is kept in memory, so this works for
+    documents of any size, and chunks may be split anywhere, even within
+    an item. A single object stored under *key* instead of a list is
+    yielded as the only item. Nothing is yielded if *key* is not
+    found in the document.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    key_re = re.compile(r'"%s"\s*:\s*([\[{])' % re.escape(key))
+    chunks = iter(chunks)
+
+    buf = u''
+    while True:
+        match = key_re.search(buf)
+        if match:
+            break
+        try:
+            buf += text_decoder.decode(next(chunks))
+        except StopIteration:
+            return
+
+    is_list = match.group(1) == '['
+    pos = match.end(1) if is_list else match.start(1)
+    exhausted = False
+
+    while True:
+        pos = _JSON_SEPARATORS_RE.match(buf, pos).end()
+        if pos < len(buf):
+            if is_list and buf[pos] == ']':
+                return
+
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # the item is incomplete, read more data below
+                pass
+            else:
+                # a number that isn't followed by a delimiter might
+                # continue in the next chunk, e.g. '1' or '1.' of '1.5'
+                if exhausted or buf[end:end + 1] in _JSON_DELIMITERS:
+                    yield item
+                    if not is_list:
+                        return
+                    pos = end
+                    continue
+
+        if exhausted:
+            raise ValueError("Unexpected end of JSON data in '%s'" % key)
+        try:
+            buf = buf[pos:] + text_decoder.decode(next(chunks))
+        except StopIteration:
+            buf = buf[pos:]
+            exhausted = True
+        pos = 0
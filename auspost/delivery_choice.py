@@ -1,29 +1,100 @@
+import os
+import json
+import pytz
+import inspect
 import requests
+import threading
 
-from datetime import date
+from datetime import date, datetime, timedelta
+from timeit import default_timer
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 from auspost import common
+from auspost.cache import LocMemCache
+from auspost.postcodes import PostcodeTable
+from auspost.transport import SingleFlight
 
 
 DEV_ENDPOINT = 'https://devcentre.auspost.com.au/myapi'
 PRD_ENDPOINT = 'https://api.auspost.com.au'
 
+# version of the format written by ``Model.to_dict``
+SERIALIZATION_VERSION = 1
+
+EPOCH = datetime(1970, 1, 1, tzinfo=pytz.utc)
+
 
 def api_request(f):
-    def func(*args, **kwargs):
+    def func(self, *args, **kwargs):
         s = "".join([s.capitalize() for s in f.__name__.split('_')])
         kwargs['api_name'] = s
-        return f(*args, **kwargs)
+
+        if self.metrics is None:
+            return call_api(f, self, *args, **kwargs)
+
+        self.metrics.record_call(s)
+        try:
+            return call_api(f, self, *args, **kwargs)
+        except Exception as exc:
+            self.metrics.record_error(s, exc)
+            raise
     return func
 
 
+def call_api(f, self, *args, **kwargs):
+    if self.single_flight is None or kwargs.get('stream'):
+        return f(self, *args, **kwargs)
+
+    key = get_call_key(f, self, *args, **kwargs)
+    result, shared = self.single_flight.do(key, f, self, *args, **kwargs)
+    return self.copy_result(result) if shared else result
+
+
+def get_call_key(f, *args, **kwargs):
+    """
+    Get a hashable key for calling *f* with the given arguments that is
+    the same no matter if arguments are passed by position or keyword.
+    Argument values other than strings are compared by their unicode
+    representation, so that e.g. the postcodes ``3000`` and ``'3000'``
+    result in the same key.
+    """
+    call_args = inspect.getcallargs(f, *args, **kwargs)
+    call_args.pop('self', None)
+    call_args.update(call_args.pop('kwargs', {}))
+    return (f.__name__, freeze(call_args))
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, basestring):
+        # byte strings may hold non-ASCII data, e.g. UTF-8 addresses
+        return value
+    return unicode(value)
+
+
 class DeliveryChoiceApi(object):
 
     DELIVERY_NETWORKS = {
         '01': 'Standard',
         '02': 'Express'}
 
-    def __init__(self, username=None, password=None):
+    MAX_TRACKING_IDS = 10
+
+    # default number of seconds results of an API are cached for when a
+    # cache is configured. APIs that are not listed are not cached.
+    CACHE_TIMEOUTS = {
+        'DeliveryDates': 3600}
+
+    def __init__(self, username=None, password=None, pool_connections=10,
+                 pool_maxsize=10, pool_block=False, json_decoder=None,
+                 cache=None, cache_timeouts=None, timeout=30,
+                 rate_limiter=None, retry_policy=None, circuit_breaker=None,
+                 single_flight=None, postcode_table=None, metrics=None,
+                 estimator=None):
         self.url = DEV_ENDPOINT
         self.username = 'anonymous@auspost.com.au'
         self.password = 'password'
@@ -34,32 +105,171 @@ class DeliveryChoiceApi(object):
             self.username = username
             self.password = password
 
-    @api_request
-    def delivery_dates(self, from_postcode, to_postcode, lodgement_date,
-                       network_id='01', number_of_dates=1, **kwargs):
-
-        if not common.is_valid_postcode(from_postcode):
-            raise common.AusPostException(1001)
-
-        if not common.is_valid_postcode(to_postcode):
-            raise common.AusPostException(1002)
+        # *pool_connections* is the number of per-host pools that are kept
+        # around, *pool_maxsize* the number of keep-alive connections per
+        # host and *pool_block* whether to wait for a free connection
+        # instead of opening a throw-away one when the pool is exhausted.
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+
+        # callable used to decode the raw response body, e.g. a faster
+        # drop-in replacement for ``json.loads`` such as ``ujson.loads``.
+        self.json_decoder = json_decoder or json.loads
+
+        # optional cache for parsed results, e.g. a ``cache.LocMemCache``
+        # or a ``sqlite_cache.SQLiteCache`` shared by several processes,
+        # and the per API timeouts overriding ``CACHE_TIMEOUTS``.
+        self.cache = cache
+        self.cache_timeouts = dict(self.CACHE_TIMEOUTS)
+        self.cache_timeouts.update(cache_timeouts or {})
+
+        # seconds to wait for the API to respond, either a single value or
+        # a (connect, read) tuple as accepted by requests.
+        self.timeout = timeout
+
+        # optional ``transport.RateLimiter``, ``transport.RetryPolicy`` and
+        # ``transport.CircuitBreaker``. They are thread-safe and can be
+        # shared between multiple API instances.
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+
+        # concurrent identical API calls share a single request if
+        # *single_flight* is ``True`` or a ``transport.SingleFlight``
+        # instance, which can also be shared between API instances.
+        if single_flight is True:
+            single_flight = SingleFlight()
+        self.single_flight = single_flight or None
+
+        # reject postcodes and addresses that can't be valid without a
+        # request if *postcode_table* is ``True`` (using the bundled postcode
+        # ranges) or a ``postcodes.PostcodeTable``.
+        if postcode_table is True:
+            postcode_table = PostcodeTable()
+        self.postcode_table = postcode_table or None
+
+        # optional ``metrics.Metrics`` collecting call counts, errors,
+        # latencies, response sizes and cache hits per API.
+        self.metrics = metrics
+
+        # optional ``estimator.DeliveryDateEstimator`` that learns from the
+        # delivery dates returned by the API and is used instead of the API
+        # when it is unavailable or when an estimate is asked for.
+        self.estimator = estimator
+
+        self._session = None
+        self._session_pid = None
+        self._session_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
-        if network_id not in self.DELIVERY_NETWORKS:
-            raise common.AusPostException(1003)
-
-        if lodgement_date < date.today():
-            raise common.AusPostException(1004)
-
-        if number_of_dates not in range(1, 11):
-            raise common.AusPostException(1005)
+    @property
+    def session(self):
+        """
+        The pooled HTTP session used for all requests. It is created lazily
+        and re-created in a child process after a fork so that keep-alive
+        connections are never shared between processes (e.g. gunicorn
+        prefork workers).
+        """
+        pid = os.getpid()
+        if self._session_pid != pid:
+            # the lock might have been held by another thread at the time
+            # of the fork, so the child gets a fresh one.
+            self._session_lock = threading.Lock()
+            self._session = None
+            self._session_pid = pid
+
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self.create_session()
+        return self._session
+
+    def create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.auth = (self.username, self.password)
+        session.cookies.set('OBBasicAuth', 'fromDialog')
+        return session
+
+    def close(self):
+        """
+        Close all pooled connections. The API can still be used afterwards,
+        a new session is created on the next request.
+        """
+        with self._session_lock:
+            session, self._session = self._session, None
+
+        if session is not None and self._session_pid == os.getpid():
+            session.close()
 
-        response = self.send_request(kwargs.get('api_name'), params={
+    @api_request
+    def delivery_dates(self, from_postcode, to_postcode, lodgement_date,
+                       network_id='01', number_of_dates=1, estimate=False,
+                       **kwargs):
+        """
+        Get the delivery dates for a parcel lodged on *lodgement_date*.
+
+        If an ``estimator`` is configured, the dates are estimated when the
+        API fails with an HTTP error or doesn't respond in time. With
+        *estimate* set to ``True``, an estimate is returned without asking
+        the API if the estimator is confident enough. Estimated dates are
+        ``estimator.EstimatedDeliveryDate`` instances.
+        """
+        self.check_lane(from_postcode, to_postcode, network_id)
+        self.check_lodgement(lodgement_date, number_of_dates)
+
+        estimator = self.estimator
+        if estimate and estimator is not None:
+            dates = estimator.estimate(
+                from_postcode, to_postcode, lodgement_date,
+                network_id=network_id, number_of_dates=number_of_dates,
+                min_confidence=estimator.min_confidence)
+            if dates:
+                return dates
+
+        def from_json(json):
+            dates = DeliveryDate.from_json(json)
+            if estimator is not None:
+                estimator.learn(from_postcode, to_postcode, network_id, dates)
+            return dates
+
+        params = {
             'fromPostcode': from_postcode,
             'toPostcode': to_postcode,
             'lodgementDate': lodgement_date.strftime("%Y-%m-%d"),
             'networkId': network_id,
-            'numberOfDates': number_of_dates})
-        return DeliveryDate.from_json(response.json())
+            'numberOfDates': number_of_dates}
+        # the lodgement date rolls over at midnight so cached delivery dates
+        # must not outlive the current AusPost business day.
+        api_name = kwargs.get('api_name')
+        cache_timeout = self.cache_timeouts.get(api_name)
+        if cache_timeout:
+            cache_timeout = min(cache_timeout, common.seconds_until_midnight())
+
+        try:
+            return self.get_result(
+                api_name, params, from_json=from_json,
+                cache_timeout=cache_timeout)
+        except (common.AusPostHttpException, requests.RequestException):
+            if estimator is None:
+                raise
+            dates = estimator.estimate(
+                from_postcode, to_postcode, lodgement_date,
+                network_id=network_id, number_of_dates=number_of_dates)
+            if not dates:
+                raise
+            return dates
 
     @api_request
     def delivery_timeslots(self, day=None, **kwargs):
@@ -67,33 +277,270 @@ class DeliveryChoiceApi(object):
         raise NotImplementedError()
 
     @api_request
-    def postcode_capability(self, postcode=None, **kwargs):
-        """ valid postcode or nothing (returns all postcodes) """
-        raise NotImplementedError()
+    def postcode_capability(self, postcode=None, stream=False, **kwargs):
+        """
+        valid postcode or nothing (returns all postcodes). With *stream*
+        set to ``True`` a generator is returned that parses the response
+        incrementally and yields one capability at a time.
+        """
+        params = {}
+        if postcode is not None:
+            if not common.is_valid_postcode(postcode):
+                raise common.AusPostException(1201)
+            params['postcode'] = postcode
+
+        if stream:
+            return self.stream_result(
+                kwargs.get('api_name'), params,
+                key='PostcodeDeliveryCapability',
+                from_json=PostcodeDeliveryCapability.from_item_json)
+
+        return self.get_result(
+            kwargs.get('api_name'), params,
+            from_json=PostcodeDeliveryCapability.from_json)
 
     @api_request
     def customer_collection_points(self, state=None, postcode=None,
-                                   last_update=None, **kwargs):
-        raise NotImplementedError()
+                                   last_update=None, stream=False, **kwargs):
+        """
+        Get the customer collection points, optionally restricted to a
+        *state* or *postcode*. If *last_update* is given only the points
+        that changed since that date are returned. With *stream* set to
+        ``True`` a generator is returned that parses the response
+        incrementally and yields one collection point at a time.
+        """
+        params = {}
+        if state is not None:
+            if state not in common.AUSTRALIAN_STATES:
+                raise common.AusPostException(1301)
+            params['state'] = state
+
+        if postcode is not None:
+            if not common.is_valid_postcode(postcode):
+                raise common.AusPostException(1302)
+            params['postcode'] = postcode
+
+        if last_update is not None:
+            if not isinstance(last_update, date):
+                raise common.AusPostException(1303)
+            params['lastUpdate'] = last_update.strftime("%Y-%m-%d")
+
+        if stream:
+            return self.stream_result(
+                kwargs.get('api_name'), params,
+                key='CustomerCollectionPoint',
+                from_json=CustomerCollectionPoint.from_item_json)
+
+        return self.get_result(
+            kwargs.get('api_name'), params,
+            from_json=CustomerCollectionPoint.from_json)
 
     @api_request
-    def query_tracking(self, tracking_numbers, **kwargs):
-        response = self.send_request(
+    def query_tracking(self, tracking_numbers, lazy=False, **kwargs):
+        """
+        Get the ``TrackingResult`` for up to 10 *tracking_numbers*. With
+        *lazy* set to ``True`` the events of an article are only parsed
+        when they are accessed, which is much cheaper if only the status
+        or the ``latest_event`` of an article is used.
+        """
+        if len(tracking_numbers) > self.MAX_TRACKING_IDS:
+            raise common.AusPostException(1402)
+
+        return self.get_result(
             kwargs.get('api_name'),
-            params={'q': ",".join(tracking_numbers)})
-        return TrackingResult.from_json(response.json())
+            params={'q': ",".join(tracking_numbers)},
+            from_json=lambda json: TrackingResult.from_json(json, lazy=lazy))
 
     @api_request
     def validate_address(self, line1, suburb, state, postcode, line2=None,
                          country="Australia", **kwargs):
-        response = self.send_request(kwargs.get('api_name'), params={
+        if self.postcode_table is not None:
+            self.postcode_table.check_address(
+                suburb, state, postcode, country=country)
+
+        params = {
             "addressLine1": line1,
             "addressLine2": line2,
             "suburb": suburb,
             "state": state,
             "postcode": postcode,
-            "country": country})
-        return ValidationResult.from_json(response.json())
+            "country": country}
+        return self.get_result(
+            kwargs.get('api_name'), params,
+            from_json=ValidationResult.from_json)
+
+    def check_lane(self, from_postcode, to_postcode, network_id='01'):
+        """
+        Raise the ``AusPostException`` the delivery dates API would return
+        for an invalid *from_postcode* (1001), *to_postcode* (1002) or
+        *network_id* (1003).
+        """
+        if not common.is_valid_postcode(from_postcode):
+            raise common.AusPostException(1001)
+
+        if not common.is_valid_postcode(to_postcode):
+            raise common.AusPostException(1002)
+
+        if network_id not in self.DELIVERY_NETWORKS:
+            raise common.AusPostException(1003)
+
+        if self.postcode_table is not None:
+            self.postcode_table.check_postcode(from_postcode, 1001)
+            self.postcode_table.check_postcode(to_postcode, 1002)
+
+    def check_lodgement(self, lodgement_date, number_of_dates=1):
+        """
+        Raise the ``AusPostException`` the delivery dates API would return
+        for a *lodgement_date* in the past (1004) or an invalid
+        *number_of_dates* (1005).
+        """
+        if lodgement_date < date.today():
+            raise common.AusPostException(1004)
+
+        if number_of_dates not in range(1, 11):
+            raise common.AusPostException(1005)
+
+    def iter_delivery_dates(self, lanes, lodgement_date, number_of_dates=1,
+                            max_workers=4):
+        """
+        Get the delivery dates for many *lanes*, which are tuples of
+        ``(from_postcode, to_postcode)`` or ``(from_postcode, to_postcode,
+        network_id)``, running *max_workers* requests concurrently. Yields
+        a ``(lane, delivery_dates, exception)`` tuple for every distinct
+        lane in input order, where either *delivery_dates* or *exception*
+        is ``None``.
+
+        Lanes are normalised with ``common.normalize_lane``, so lanes that
+        only differ in the type of the postcodes (e.g. ``3000`` and
+        ``'3000'``) are requested once, and the yielded *lane* is the
+        normalised one. Invalid lodgement dates and numbers of dates are
+        rejected before any request is made, invalid lanes fail without a
+        request.
+        """
+        self.check_lodgement(lodgement_date, number_of_dates)
+
+        def iter_lanes():
+            seen = set()
+            for lane in lanes:
+                lane = common.normalize_lane(*lane)
+                if lane not in seen:
+                    seen.add(lane)
+                    yield lane
+
+        def get_delivery_dates(lane):
+            # always use the blocking implementation, even in subclasses
+            # that wrap delivery_dates.
+            return DeliveryChoiceApi.delivery_dates(
+                self, lane[0], lane[1], lodgement_date, network_id=lane[2],
+                number_of_dates=number_of_dates)
+
+        return common.bounded_map(
+            get_delivery_dates, iter_lanes(), max_workers=max_workers)
+
+    def bulk_delivery_dates(self, lanes, lodgement_date, number_of_dates=1,
+                            max_workers=4):
+        """
+        Get the delivery dates for many *lanes* concurrently (see
+        ``iter_delivery_dates``). Returns a tuple of a dictionary mapping
+        each lane to its list of ``DeliveryDate`` and a list of ``(lane,
+        exception)`` tuples for the lanes that failed. Lanes are normalised
+        with ``common.normalize_lane``, which must be used to look them up::
+
+            dates, errors = api.bulk_delivery_dates(lanes, date.today())
+            dates[common.normalize_lane(3000, 2000)]
+        """
+        delivery_dates, errors = {}, []
+        for lane, dates, exc in self.iter_delivery_dates(
+                lanes, lodgement_date, number_of_dates=number_of_dates,
+                max_workers=max_workers):
+            if exc is not None:
+                errors.append((lane, exc))
+            else:
+                delivery_dates[lane] = dates
+        return delivery_dates, errors
+
+    def iter_query_tracking(self, tracking_numbers, max_workers=4,
+                            lazy=False):
+        """
+        Track any number of *tracking_numbers* by splitting them into
+        requests of at most ``MAX_TRACKING_IDS`` IDs that are run with
+        *max_workers* threads. Yields a ``(tracking_ids, tracking_results,
+        exception)`` tuple for every request in input order, where either
+        *tracking_results* or *exception* is ``None``.
+        """
+        def query(chunk):
+            # always use the blocking implementation, even in subclasses
+            # that wrap query_tracking.
+            return DeliveryChoiceApi.query_tracking(self, chunk, lazy=lazy)
+
+        return common.bounded_map(
+            query,
+            common.chunked(tracking_numbers, self.MAX_TRACKING_IDS),
+            max_workers=max_workers)
+
+    def bulk_query_tracking(self, tracking_numbers, max_workers=4,
+                            lazy=False):
+        """
+        Track any number of *tracking_numbers* concurrently. Returns a tuple
+        of the merged list of ``TrackingResult`` in input order and a list
+        of ``(tracking_ids, exception)`` tuples for failed requests.
+        """
+        tracking_results, errors = [], []
+        for chunk, results, exc in self.iter_query_tracking(
+                tracking_numbers, max_workers=max_workers, lazy=lazy):
+            if exc is not None:
+                errors.append((chunk, exc))
+            else:
+                tracking_results.extend(results)
+        return tracking_results, errors
+
+    def iter_validate_addresses(self, addresses, max_workers=4, cache=None):
+        """
+        Validate any number of *addresses*, which are either dictionaries
+        of ``validate_address`` keyword arguments or tuples of its
+        positional arguments. Yields ``(address, validation_result,
+        exception)`` tuples in input order.
+
+        Addresses are normalised (see ``common.normalize_address``) and
+        every distinct address is only validated once: repeated addresses
+        are answered from *cache*, a ``cache.LocMemCache`` by default, and
+        concurrent duplicates share a single request. Errors are cached as
+        ``(code, message)`` so that any cache backend can store them.
+        """
+        if cache is None:
+            cache = LocMemCache(max_entries=100000, timeout=24 * 3600)
+        single_flight = SingleFlight()
+
+        def validate(key):
+            kwargs = dict(zip(common.ADDRESS_FIELDS, key))
+            try:
+                result = DeliveryChoiceApi.validate_address(self, **kwargs)
+            except common.AusPostHttpException:
+                raise
+            except common.AusPostException as exc:
+                # invalid addresses stay invalid, remember the error
+                cache.set(key, (None, (exc.code, exc.message)))
+                raise
+            cache.set(key, (result, None))
+            return result
+
+        def validate_address(address):
+            if isinstance(address, dict):
+                key = common.normalize_address(**address)
+            else:
+                key = common.normalize_address(*address)
+
+            cached = cache.get(key)
+            if cached is None:
+                return single_flight.do(key, validate, key)[0]
+
+            result, error = cached
+            if error is not None:
+                raise common.AusPostException(*error)
+            return result
+
+        return common.bounded_map(
+            validate_address, addresses, max_workers=max_workers)
 
     def get_parameter_kwargs(self, **kwargs):
         params = {}
@@ -103,32 +550,463 @@ class DeliveryChoiceApi(object):
             params[key] = value
         return params
 
-    def send_request(self, path, params, **kwargs):
+    def send_request(self, path, params, stream=False, **kwargs):
         request_url = u"%s/%s.%s" % (self.url, path, self.format)
-        response = requests.get(
-            request_url,
-            auth=(self.username, self.password),
-            cookies={'OBBasicAuth': 'fromDialog'},
-            params=params)
+
+        retry = 0
+        while True:
+            trial = False
+            if self.circuit_breaker is not None:
+                trial = self.circuit_breaker.before_request()
+
+            try:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire()
+                response = self.session.get(
+                    request_url, params=params, stream=stream,
+                    timeout=self.timeout)
+            except requests.RequestException as exc:
+                self.record_failure()
+                retryable = isinstance(
+                    exc, (requests.ConnectionError, requests.Timeout))
+                if not (retryable and self.can_retry(retry)):
+                    raise
+                self.retry_policy.backoff(retry)
+                retry += 1
+                continue
+            else:
+                self.record_response(response)
+            finally:
+                # don't block the circuit if the trial request failed
+                # without recording its outcome
+                if trial:
+                    self.circuit_breaker.end_trial()
+
+            if (response.status_code == 200 or not self.can_retry(retry)
+                    or not self.retry_policy.is_retryable(response)):
+                break
+
+            response.close()
+            self.retry_policy.backoff(retry, response)
+            retry += 1
+
         self.check_response(response)
         return response
 
+    def can_retry(self, retry):
+        return (self.retry_policy is not None
+                and retry < self.retry_policy.max_retries)
+
+    def record_response(self, response):
+        if response.status_code >= 500:
+            self.record_failure()
+            return
+
+        # any other response means that the API is up, even if it is
+        # throttling requests.
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success()
+
+        if self.rate_limiter is not None:
+            if response.status_code == 429:
+                self.rate_limiter.throttled()
+            else:
+                self.rate_limiter.succeeded()
+
+    def record_failure(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_failure()
+
+    def get_result(self, path, params, from_json, cache_timeout=None):
+        """
+        Request *path* and return the result of passing the JSON response
+        to *from_json*. The response body is decoded exactly once and the
+        decoded data is checked for business errors before it is parsed.
+
+        If a cache is configured, the parsed result is cached for
+        *cache_timeout* seconds, by default the timeout configured for
+        *path* in ``cache_timeouts``, and returned without a request for
+        subsequent calls with the same *params*.
+        """
+        if cache_timeout is None:
+            cache_timeout = self.cache_timeouts.get(path)
+        metrics = self.metrics
+        use_cache = bool(self.cache is not None and cache_timeout)
+        if use_cache:
+            cache_key = self.get_cache_key(path, params)
+            result = self.cache.get(cache_key)
+            if metrics is not None:
+                metrics.record_cache(path, result is not None)
+            if result is not None:
+                return self.copy_result(result)
+
+        start = default_timer()
+        response = self.send_request(path, params)
+        if metrics is not None:
+            decode_start = default_timer()
+            metrics.record_latency(path, 'network', decode_start - start)
+            metrics.record_response_bytes(path, len(response.content))
+
+        json_data = self.decode_response(response)
+        self.check_json(json_data)
+        if metrics is not None:
+            model_start = default_timer()
+            metrics.record_latency(path, 'decode', model_start - decode_start)
+
+        result = from_json(json_data)
+        if metrics is not None:
+            metrics.record_latency(
+                path, 'model', default_timer() - model_start)
+
+        if use_cache:
+            self.cache.set(cache_key, result, timeout=cache_timeout)
+            result = self.copy_result(result)
+        return result
+
+    def get_cache_key(self, path, params):
+        return (path,) + tuple(
+            (key, unicode(value)) for key, value in sorted(params.items()))
+
+    def copy_result(self, result):
+        # cached lists are shared, don't let callers modify them
+        if isinstance(result, list):
+            return list(result)
+        return result
+
+    def stream_result(self, path, params, key, from_json,
+                      chunk_size=64 * 1024):
+        """
+        Request *path* and incrementally parse the items in the list stored
+        under *key* in the response, yielding the result of *from_json* for
+        each of them. The response body is read in chunks of *chunk_size*
+        bytes so that memory usage does not depend on the response size.
+        """
+        stats = {'network': 0.0, 'decode': 0.0, 'model': 0.0, 'bytes': 0}
+        try:
+            for result in self.iter_stream_items(
+                    path, params, key, from_json, chunk_size, stats):
+                yield result
+        except Exception as exc:
+            if self.metrics is not None:
+                self.metrics.record_error(path, exc)
+            raise
+        finally:
+            if self.metrics is not None and stats['bytes']:
+                for phase in ('network', 'decode', 'model'):
+                    self.metrics.record_latency(path, phase, stats[phase])
+                self.metrics.record_response_bytes(path, stats['bytes'])
+
+    def iter_stream_items(self, path, params, key, from_json, chunk_size,
+                          stats):
+        start = default_timer()
+        response = self.send_request(path, params, stream=True)
+        stats['network'] += default_timer() - start
+
+        # the response is kept until the first item is found, so that a
+        # response without items can be checked for business errors.
+        head = []
+
+        def iter_content():
+            chunks = iter(response.iter_content(chunk_size))
+            while True:
+                read_start = default_timer()
+                chunk = next(chunks, None)
+                # reading happens while the items are decoded, don't count
+                # it as decoding time.
+                elapsed = default_timer() - read_start
+                stats['network'] += elapsed
+                stats['decode'] -= elapsed
+                if chunk is None:
+                    return
+
+                stats['bytes'] += len(chunk)
+                if head is not None:
+                    head.append(chunk)
+                yield chunk
+
+        found = False
+        items = common.iter_json_array(iter_content(), key)
+        try:
+            while True:
+                decode_start = default_timer()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    break
+                finally:
+                    stats['decode'] += default_timer() - decode_start
+
+                if not found:
+                    found, head = True, None
+                model_start = default_timer()
+                result = from_json(item)
+                stats['model'] += default_timer() - model_start
+                yield result
+        finally:
+            response.close()
+
+        if not found:
+            try:
+                json_data = self.json_decoder(b''.join(head))
+            except ValueError:
+                return
+            self.check_json(json_data)
+
+    def decode_response(self, response):
+        try:
+            return self.json_decoder(response.content)
+        except ValueError as exc:
+            raise common.AusPostHttpException(
+                response.status_code, u"Invalid JSON response: %s" % exc)
+
     def check_response(self, response):
         if response.status_code != 200:
             raise common.AusPostHttpException(
                 response.status_code, response.reason)
 
+    def check_json(self, json_data):
         try:
-            exc = response.json().values()[0]['BusinessException']
-            code, message = exc['Code'], exc['Description']
-        except:
+            exc = json_data.values()[0]['BusinessException']
+        except (AttributeError, IndexError, KeyError, TypeError):
             return
 
+        code, message = exc.get('Code'), exc.get('Description')
         if code:
             raise common.AusPostException(code, message)
 
 
-class DeliveryDate(object):
+class AsyncDeliveryChoiceApi(DeliveryChoiceApi):
+    """
+    Version of the :class:`DeliveryChoiceApi` whose API calls return
+    immediately. Each call is run on a pool of *max_workers* threads and
+    returns a :class:`concurrent.futures.Future` that resolves to the same
+    parsed result (or raises the same :class:`common.AusPostException`) as
+    the blocking call would. The calls still block a worker thread, so at
+    most *max_workers* requests are in flight at a time and further calls
+    wait in the queue of the pool. The connection pool is sized to match
+    the number of workers unless *pool_maxsize* is given explicitly.
+    """
+
+    def __init__(self, username=None, password=None, max_workers=10,
+                 **kwargs):
+        kwargs.setdefault('pool_maxsize', max_workers)
+        super(AsyncDeliveryChoiceApi, self).__init__(
+            username, password, **kwargs)
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self):
+        pid = os.getpid()
+        if self._executor_pid != pid:
+            # worker threads do not survive a fork
+            self._executor_lock = threading.Lock()
+            self._executor = None
+            self._executor_pid = pid
+
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers)
+        return self._executor
+
+    def submit(self, method, *args, **kwargs):
+        return self.executor.submit(method, *args, **kwargs)
+
+    def close(self):
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+
+        if executor is not None and self._executor_pid == os.getpid():
+            executor.shutdown(wait=True)
+        super(AsyncDeliveryChoiceApi, self).close()
+
+    def delivery_dates(self, *args, **kwargs):
+        return self.submit(
+            super(AsyncDeliveryChoiceApi, self).delivery_dates,
+            *args, **kwargs)
+
+    def delivery_timeslots(self, *args, **kwargs):
+        return self.submit(
+            super(AsyncDeliveryChoiceApi, self).delivery_timeslots,
+            *args, **kwargs)
+
+    def postcode_capability(self, *args, **kwargs):
+        return self.submit(
+            super(AsyncDeliveryChoiceApi, self).postcode_capability,
+            *args, **kwargs)
+
+    def customer_collection_points(self, *args, **kwargs):
+        return self.submit(
+            super(AsyncDeliveryChoiceApi, self).customer_collection_points,
+            *args, **kwargs)
+
+    def query_tracking(self, *args, **kwargs):
+        return self.submit(
+            super(AsyncDeliveryChoiceApi, self).query_tracking,
+            *args, **kwargs)
+
+    def validate_address(self, *args, **kwargs):
+        return self.submit(
+            super(AsyncDeliveryChoiceApi, self).validate_address,
+            *args, **kwargs)
+
+
+class Model(object):
+    """
+    Base class of all API response models. Models define ``__slots__``
+    instead of using a per-instance ``__dict__`` which considerably reduces
+    the memory used by large numbers of them, e.g. tracking events.
+    """
+    __slots__ = ()
+
+    # public properties that are backed by private slots
+    property_fields = ()
+
+    @classmethod
+    def get_field_names(cls):
+        """
+        Names of the public attributes of the model: all slots that aren't
+        private and the ``property_fields``.
+        """
+        names = _field_names.get(cls)
+        if names is None:
+            names = _field_names[cls] = tuple(
+                name for name in cls.get_slot_names()
+                if not name.startswith('_')) + tuple(cls.property_fields)
+        return names
+
+    @classmethod
+    def get_slot_names(cls):
+        names = _slot_names.get(cls)
+        if names is None:
+            names = []
+            for klass in reversed(cls.__mro__):
+                names.extend(klass.__dict__.get('__slots__', ()))
+            names = _slot_names[cls] = tuple(names)
+        return names
+
+    # objects with __slots__ can't be pickled with protocols 0 and 1 in
+    # Python 2 unless they provide their state explicitly.
+    def __getstate__(self):
+        state = {}
+        for name in self.get_slot_names():
+            try:
+                state[name] = getattr(self, name)
+            except AttributeError:
+                pass
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def to_dict(self):
+        """
+        Return the model as a dictionary of plain values that can be stored
+        as JSON or msgpack and turned back into the model with
+        ``from_dict``. Timestamps are stored as microseconds since the
+        epoch, so they don't have to be parsed again.
+        """
+        data = encode_value(self)
+        data['_version'] = SERIALIZATION_VERSION
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        version = data.get('_version')
+        if version != SERIALIZATION_VERSION:
+            raise ValueError(
+                "unsupported serialization version: %s" % version)
+
+        model = decode_value(data)
+        if not isinstance(model, cls):
+            raise ValueError("%s is not a %s" % (
+                model.__class__.__name__, cls.__name__))
+        return model
+
+    @classmethod
+    def get_model_class(cls, name):
+        """ Return the subclass of ``Model`` with the given *name*. """
+        model_class = _model_classes.get(name)
+        if model_class is None:
+            subclasses = Model.__subclasses__()
+            while subclasses:
+                subclass = subclasses.pop()
+                _model_classes[subclass.__name__] = subclass
+                subclasses.extend(subclass.__subclasses__())
+
+            model_class = _model_classes.get(name)
+            if model_class is None:
+                raise ValueError("unknown model: %s" % name)
+        return model_class
+
+
+_slot_names = {}
+_field_names = {}
+_model_classes = {}
+
+
+def encode_value(value):
+    if isinstance(value, Model):
+        data = {'_type': value.__class__.__name__}
+        for name in value.get_slot_names():
+            item = getattr(value, name, None)
+            if item is not None:
+                data[name] = encode_value(item)
+        return data
+
+    if isinstance(value, (list, tuple)):
+        return [encode_value(item) for item in value]
+
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = pytz.utc.localize(value)
+        delta = value - EPOCH
+        return {'_type': 'datetime', 'us': (
+            (delta.days * 86400 + delta.seconds) * 1000000 +
+            delta.microseconds)}
+
+    if isinstance(value, date):
+        return {'_type': 'date', 'ordinal': value.toordinal()}
+
+    if isinstance(value, dict):
+        # raw JSON, e.g. the events of lazily parsed articles
+        return dict((key, encode_value(item)) for key, item in value.items())
+    return value
+
+
+def decode_value(value):
+    if isinstance(value, list):
+        return [decode_value(item) for item in value]
+
+    if not isinstance(value, dict):
+        return value
+
+    type_name = value.get('_type')
+    if type_name is None:
+        return dict((key, decode_value(item)) for key, item in value.items())
+
+    if type_name == 'datetime':
+        return EPOCH + timedelta(microseconds=value['us'])
+
+    if type_name == 'date':
+        return date.fromordinal(value['ordinal'])
+
+    model_class = Model.get_model_class(type_name)
+    model = model_class.__new__(model_class)
+    for name in model_class.get_slot_names():
+        item = value.get(name)
+        if isinstance(item, (list, dict)):
+            item = decode_value(item)
+        setattr(model, name, item)
+    return model
+
+
+class DeliveryDate(Model):
+    __slots__ = ('delivery_date', 'working_days', 'timed_delivery')
 
     def __init__(self, delivery_date, working_days, timed_delivery):
         self.delivery_date = delivery_date
@@ -145,11 +1023,13 @@ class DeliveryDate(object):
             raise Exception
 
         res = common.ensure_list(res)
+        delivery_dates = common.get_aware_utc_datetimes(
+            [item['DeliveryDate'] for item in res])
 
         dates = []
-        for item in res:
+        for item, delivery_date in zip(res, delivery_dates):
             dates.append(cls(
-                common.get_aware_utc_datetime(item['DeliveryDate']),
+                delivery_date,
                 item['NumberOfWorkingDays'],
                 item['TimedDeliveryEnabled']))
 
@@ -163,7 +1043,8 @@ class DeliveryDate(object):
         return "%s %s" % (self.delivery_date, self.timed_delivery)
 
 
-class TimePeriod(object):
+class TimePeriod(Model):
+    __slots__ = ('start_time', 'end_time', 'duration')
 
     def __init__(self, start_time, end_time, duration):
         self.start_time = start_time
@@ -197,7 +1078,8 @@ class TimePeriod(object):
         return periods
 
 
-class TimeSlot(object):
+class TimeSlot(Model):
+    __slots__ = ('day', 'periods')
 
     def __init__(self, week_day, periods=None):
         self.day = week_day
@@ -217,7 +1099,8 @@ class TimeSlot(object):
         return timeslots
 
 
-class PostcodeDeliveryCapability(object):
+class PostcodeDeliveryCapability(Model):
+    __slots__ = ('postcode', 'days', 'last_modified')
 
     def __init__(self, postcode, days, last_modified):
         self.postcode = postcode
@@ -233,21 +1116,29 @@ class PostcodeDeliveryCapability(object):
             raise Exception
 
         result = common.ensure_list(result)
+        last_modified = common.get_aware_utc_datetimes(
+            [item['LastModified'] for item in result])
 
         capabilities = []
-        for item in result:
-            utc_dt = common.get_aware_utc_datetime(item['LastModified'])
-            capabilities.append(
-                cls(
-                    postcode=item['Postcode'],
-                    last_modified=utc_dt,
-                    days=Day.from_json(item['WeekDay']),
-                )
-            )
+        for item, utc_dt in zip(result, last_modified):
+            capabilities.append(cls.from_item_json(item, last_modified=utc_dt))
         return capabilities
 
+    @classmethod
+    def from_item_json(cls, item, last_modified=None):
+        if last_modified is None:
+            last_modified = common.get_aware_utc_datetime(
+                item['LastModified'])
+
+        return cls(
+            postcode=item['Postcode'],
+            last_modified=last_modified,
+            days=Day.from_json(item['WeekDay']),
+        )
 
-class Day(object):
+
+class Day(Model):
+    __slots__ = ('name', 'standard_delivery_enabled', 'timed_delivery_enabled')
 
     def __init__(self, name, standard_delivery_enabled,
                  timed_delivery_enabled):
@@ -269,7 +1160,77 @@ class Day(object):
         return days
 
 
-class TrackingResult(object):
+class CustomerCollectionPoint(Model):
+    __slots__ = ('id', 'name', 'active', 'address', 'latitude', 'longitude',
+                 'bordering_postcodes', 'service_code', 'service_description',
+                 'location_instructions', 'access_summary',
+                 'number_of_lockers')
+
+    def __init__(self, id, name, active, address, latitude=None,
+                 longitude=None, bordering_postcodes=None, service_code=None,
+                 service_description=None, location_instructions=None,
+                 access_summary=None, number_of_lockers=None):
+        self.id = unicode(id)
+        self.name = name
+        self.active = active
+        self.address = address
+        self.latitude = latitude
+        self.longitude = longitude
+        self.bordering_postcodes = bordering_postcodes or []
+        self.service_code = service_code
+        self.service_description = service_description
+        self.location_instructions = location_instructions
+        self.access_summary = access_summary
+        self.number_of_lockers = number_of_lockers
+
+    @classmethod
+    def from_json(cls, json):
+        try:
+            result = json['CustomerCollectionPoints']
+        except KeyError:
+            raise Exception
+
+        try:
+            result = result['CustomerCollectionPoint']
+        except (KeyError, TypeError):
+            # no collection points have changed since the last update
+            return []
+
+        points = []
+        for item in common.ensure_list(result):
+            points.append(cls.from_item_json(item))
+        return points
+
+    @classmethod
+    def from_item_json(cls, item):
+        try:
+            latitude = float(item['Latitude'])
+            longitude = float(item['Longitude'])
+        except (KeyError, TypeError, ValueError):
+            latitude = longitude = None
+
+        return cls(
+            id=item['DeliveryPointIdentifier'],
+            name=item['CustomerCollectionPointName'],
+            active=item.get('Active', False),
+            address=Address.from_json(item['Address']),
+            latitude=latitude,
+            longitude=longitude,
+            bordering_postcodes=common.ensure_list(
+                item.get('BorderingLocalityPostcode') or []),
+            service_code=item.get('ServiceCode'),
+            service_description=item.get('ServiceDescription'),
+            location_instructions=item.get('LocationInstructions'),
+            access_summary=item.get('CustomerAccessSummary'),
+            number_of_lockers=item.get('NumberofLockers'))
+
+    def __repr__(self):
+        return "<%s id='%s' name='%s'>" % (
+            self.__class__.__name__, self.id, self.name)
+
+
+class TrackingResult(Model):
+    __slots__ = ('id', 'article', 'consignment')
 
     def __init__(self, id, article=None, consignment=None):
         self.id = unicode(id)
@@ -277,7 +1238,7 @@ class TrackingResult(object):
         self.consignment = consignment
 
     @classmethod
-    def from_json(cls, json):
+    def from_json(cls, json, lazy=False):
         tracking_results = []
         try:
             tracking_list = json['QueryTrackEventsResponse']['TrackingResult']
@@ -287,7 +1248,8 @@ class TrackingResult(object):
         for item in common.ensure_list(tracking_list):
             tracking_result = cls(id=item['TrackingID'])
 
-            articles = Article.from_json(item.get('ArticleDetails', []))
+            articles = Article.from_json(
+                item.get('ArticleDetails', []), lazy=lazy)
             if len(articles) == 1:
                 tracking_result.article = articles[0]
             else:
@@ -295,7 +1257,8 @@ class TrackingResult(object):
                     'found more than 1 article in JSON response')
 
             if 'ConsignmentDetails' in item:
-                consignment = Consignment.from_json(item['ConsignmentDetails'])
+                consignment = Consignment.from_json(
+                    item['ConsignmentDetails'], lazy=lazy)
                 tracking_result.consignment = consignment
 
             tracking_results.append(tracking_result)
@@ -303,7 +1266,8 @@ class TrackingResult(object):
         return tracking_results
 
 
-class ValidationResult(object):
+class ValidationResult(Model):
+    __slots__ = ('address', 'is_valid')
 
     def __init__(self, address, is_valid=False):
         self.address = address
@@ -335,7 +1299,10 @@ class ValidationResult(object):
             valid='valid' if self.is_valid else 'invalid')
 
 
-class Article(object):
+class Article(Model):
+    __slots__ = ('id', 'product_name', 'event_notification', 'status',
+                 'origin', 'destination', '_events', '_events_json')
+    property_fields = ('events',)
 
     def __init__(self, id, product_name=None, event_notification=None,
                  status=None, origin=None, destination=None, events=None):
@@ -345,10 +1312,46 @@ class Article(object):
         self.status = status
         self.origin = origin
         self.destination = destination
-        self.events = events or []
+        self.events = events
+
+    @property
+    def events(self):
+        # events of lazily parsed articles are only created when they are
+        # accessed for the first time.
+        if self._events_json is not None:
+            self._events = Event.from_json(self._events_json)
+            self._events_json = None
+        return self._events
+
+    @events.setter
+    def events(self, events):
+        self._events = events or []
+        self._events_json = None
+
+    @property
+    def latest_event(self):
+        """
+        The most recent event of the article or ``None``. The API lists
+        the events of an article newest first, so for lazily parsed
+        articles only the first event is created.
+        """
+        if self._events_json is not None:
+            events = common.ensure_list(self._events_json.get('Event', []))
+            if not events:
+                return None
+            return Event.from_json({'Event': events[:1]})[0]
+
+        if self._events:
+            return self._events[0]
+        return None
 
     @classmethod
-    def from_json(cls, json):
+    def from_json(cls, json, lazy=False):
+        """
+        Create articles from the *json* article details. If *lazy* is
+        ``True`` the events are kept as JSON and only turned into ``Event``
+        objects when ``events`` is accessed.
+        """
         articles = []
 
         for item in common.ensure_list(json):
@@ -373,20 +1376,24 @@ class Article(object):
                 pass
 
             if item.get('EventCount', 0) > 0:
-                article.events = Event.from_json(item['Events'])
+                if lazy:
+                    article._events_json = item['Events']
+                else:
+                    article.events = Event.from_json(item['Events'])
 
             articles.append(article)
         return articles
 
 
-class Consignment(object):
+class Consignment(Model):
+    __slots__ = ('id', 'articles')
 
     def __init__(self, id, articles=None):
         self.id = unicode(id)
         self.articles = articles or []
 
     @classmethod
-    def from_json(cls, json):
+    def from_json(cls, json, lazy=False):
         try:
             consignment_json = json['ConsignmentDetails']
         except KeyError:
@@ -396,11 +1403,12 @@ class Consignment(object):
 
         if consignment_json.get('ArticleCount', 0) > 0:
             consignment.articles = Article.from_json(
-                consignment.get('Articles', []))
+                consignment.get('Articles', []), lazy=lazy)
         return consignment
 
 
-class Event(object):
+class Event(Model):
+    __slots__ = ('description', 'timestamp', 'location', 'signer_name')
 
     def __init__(self, description, timestamp, location, signer_name=None):
         self.description = description
@@ -416,11 +1424,14 @@ class Event(object):
         except KeyError:
             return events
 
-        for item in common.ensure_list(event_list):
+        event_list = common.ensure_list(event_list)
+        timestamps = common.get_aware_utc_datetimes(
+            [item['EventDateTime'] for item in event_list])
+
+        for item, timestamp in zip(event_list, timestamps):
             event = cls(
                 description=item['EventDescription'],
-                timestamp=common.get_aware_utc_datetime(
-                    item['EventDateTime']),
+                timestamp=timestamp,
                 location=item['Location'])
             try:
                 event.signer_name = item['SignerName'] or None
@@ -430,7 +1441,8 @@ class Event(object):
         return events
 
 
-class Country(object):
+class Country(Model):
+    __slots__ = ('code', 'name')
 
     def __init__(self, code, name):
         self.code = code
@@ -447,7 +1459,9 @@ class Country(object):
         return u"%s (%s)" % (self.name, self.code)
 
 
-class Address(object):
+class Address(Model):
+    __slots__ = ('id', 'addressLine1', 'suburb', 'state', 'postcode',
+                 'country')
 
     def __init__(self, id, addressLine1, suburb, state, postcode, country):
         self.id = unicode(id)
@@ -460,9 +1474,15 @@ class Address(object):
     @classmethod
     def from_json(cls, json):
         try:
+            address_line = json['AddressLine']
+            if isinstance(address_line, list):
+                # collection points and customer details provide the
+                # address as a list of lines
+                address_line = u", ".join(unicode(l) for l in address_line)
+
             return cls(
                 id=json['DeliveryPointIdentifier'],
-                addressLine1=json['AddressLine'],
+                addressLine1=address_line,
                 suburb=json['SuburbOrPlaceOrLocality'],
                 state=json['StateOrTerritory'],
                 postcode=json['PostCode'],
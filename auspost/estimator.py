@@ -0,0 +1,254 @@
+import json
+import pytz
+import threading
+
+from datetime import date, datetime, timedelta
+
+from auspost.delivery_choice import DeliveryDate
+
+
+def get_easter_sunday(year):
+    """ Date of Easter Sunday in the Gregorian calendar. """
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def get_observed(day):
+    """ Move a holiday on a weekend to the following Monday. """
+    if day.weekday() >= 5:
+        return day + timedelta(days=7 - day.weekday())
+    return day
+
+
+def get_national_holidays(year):
+    """
+    Public holidays observed in all states and territories in *year*.
+    Holidays that are only observed in some states, e.g. the Queen's
+    Birthday or Labour Day, are not included.
+    """
+    easter = get_easter_sunday(year)
+    christmas = get_observed(date(year, 12, 25))
+    boxing_day = get_observed(date(year, 12, 26))
+    if boxing_day <= christmas:
+        boxing_day = christmas + timedelta(days=1)
+
+    return frozenset([
+        get_observed(date(year, 1, 1)),
+        get_observed(date(year, 1, 26)),
+        easter - timedelta(days=2),
+        easter + timedelta(days=1),
+        date(year, 4, 25),
+        christmas,
+        boxing_day,
+    ])
+
+
+class WorkingDayCalendar(object):
+    """
+    Calendar of the days parcels are delivered on: every day that is not
+    on a *weekend* (a tuple of ``date.weekday`` numbers), a national public
+    holiday (unless *national_holidays* is ``False``) or one of the
+    additional *holidays*.
+    """
+
+    def __init__(self, holidays=(), weekend=(5, 6), national_holidays=True):
+        self.holidays = frozenset(holidays)
+        self.weekend = weekend
+        self.national_holidays = national_holidays
+        self._years = {}
+
+    def get_holidays(self, year):
+        holidays = self._years.get(year)
+        if holidays is None:
+            holidays = frozenset(
+                day for day in self.holidays if day.year == year)
+            if self.national_holidays:
+                holidays = holidays.union(get_national_holidays(year))
+            self._years[year] = holidays
+        return holidays
+
+    def is_working_day(self, day):
+        return (day.weekday() not in self.weekend
+                and day not in self.get_holidays(day.year))
+
+    def add_working_days(self, start, working_days):
+        """ Return the date *working_days* working days after *start*. """
+        day = start
+        while working_days > 0:
+            day += timedelta(days=1)
+            if self.is_working_day(day):
+                working_days -= 1
+        return day
+
+
+class EstimatedDeliveryDate(DeliveryDate):
+    """
+    A ``DeliveryDate`` estimated without a request to the API. The
+    *confidence* between 0 and 1 indicates how likely it is that the API
+    would return the same date.
+    """
+    __slots__ = ('confidence',)
+
+    def __init__(self, delivery_date, working_days, timed_delivery,
+                 confidence):
+        super(EstimatedDeliveryDate, self).__init__(
+            delivery_date, working_days, timed_delivery)
+        self.confidence = confidence
+
+    def __repr__(self):
+        return "<%s date='%s' working_days='%s' confidence='%.2f'>" % (
+            self.__class__.__name__, self.delivery_date, self.working_days,
+            self.confidence)
+
+
+class DeliveryDateEstimator(object):
+    """
+    Estimate delivery dates without a request to the API based on the
+    number of working days the API returned for a lane in the past.
+
+    Every response is recorded for the lane, for the region of the
+    destination (same first two digits of the postcode) and for the
+    states of both postcodes (same first digit), so that lanes that have
+    never been requested can still be estimated, with a lower confidence.
+    The confidence is the share of the responses that agree with the
+    estimated number of working days, reduced for lanes with few
+    responses and for estimates based on a region or state.
+
+    The lanes can be saved with ``dump`` and restored with ``load``::
+
+        estimator = DeliveryDateEstimator()
+        api = DeliveryChoiceApi(estimator=estimator)
+        ...
+        estimator.dump(open('lanes.json', 'w'))
+    """
+    LEVEL_CONFIDENCE = (1.0, 0.7, 0.4)
+
+    def __init__(self, calendar=None, min_confidence=0.8, prior=2):
+        self.calendar = calendar or WorkingDayCalendar()
+        # confidence required to use an estimate instead of the API
+        self.min_confidence = min_confidence
+        # number of responses after which a lane is half as trusted as one
+        # with many responses.
+        self.prior = prior
+
+        self._lanes = {}
+        self._lock = threading.Lock()
+
+    def get_lane_keys(self, from_postcode, to_postcode, network_id='01'):
+        from_postcode = unicode(from_postcode).strip().zfill(4)
+        to_postcode = unicode(to_postcode).strip().zfill(4)
+        return [
+            (from_postcode, to_postcode, network_id),
+            (from_postcode, to_postcode[:2] + u'**', network_id),
+            (from_postcode[:1] + u'***', to_postcode[:1] + u'***',
+             network_id),
+        ]
+
+    def learn(self, from_postcode, to_postcode, network_id, delivery_dates):
+        """ Record the *delivery_dates* the API returned for a lane. """
+        if not delivery_dates:
+            return
+
+        working_days = unicode(delivery_dates[0].working_days)
+        with self._lock:
+            for key in self.get_lane_keys(
+                    from_postcode, to_postcode, network_id):
+                lane = self._lanes.get(key)
+                if lane is None:
+                    lane = self._lanes[key] = {'working_days': {},
+                                               'timed': []}
+
+                counts = lane['working_days']
+                counts[working_days] = counts.get(working_days, 0) + 1
+
+                timed = lane['timed']
+                for index, delivery_date in enumerate(delivery_dates):
+                    if index == len(timed):
+                        timed.append([0, 0])
+                    timed[index][0] += bool(delivery_date.timed_delivery)
+                    timed[index][1] += 1
+
+    def get_lane(self, from_postcode, to_postcode, network_id='01'):
+        """
+        Return the recorded data of the most specific lane and its level
+        (0 for the lane itself, 1 for the region and 2 for the states).
+        """
+        with self._lock:
+            for level, key in enumerate(self.get_lane_keys(
+                    from_postcode, to_postcode, network_id)):
+                lane = self._lanes.get(key)
+                if lane is not None:
+                    return level, lane
+        return None, None
+
+    def estimate(self, from_postcode, to_postcode, lodgement_date,
+                 network_id='01', number_of_dates=1, min_confidence=0.0):
+        """
+        Return a list of *number_of_dates* ``EstimatedDeliveryDate`` for a
+        parcel lodged on *lodgement_date* or an empty list if nothing is
+        known about the lane or the confidence is below *min_confidence*.
+        """
+        level, lane = self.get_lane(from_postcode, to_postcode, network_id)
+        if lane is None:
+            return []
+
+        with self._lock:
+            counts = sorted(
+                lane['working_days'].items(), key=lambda item: -item[1])
+            timed = [list(t) for t in lane['timed']]
+
+        working_days, count = int(counts[0][0]), counts[0][1]
+        total = sum(c for days, c in counts)
+        # share of agreeing responses, discounted for lanes with few of them
+        confidence = (float(count) / (total + self.prior) *
+                      self.LEVEL_CONFIDENCE[level])
+        if confidence < min_confidence:
+            return []
+
+        delivery_date = lodgement_date
+        if isinstance(delivery_date, datetime):
+            delivery_date = delivery_date.date()
+        delivery_date = self.calendar.add_working_days(
+            delivery_date, working_days)
+
+        dates = []
+        for index in range(number_of_dates):
+            if index:
+                delivery_date = self.calendar.add_working_days(
+                    delivery_date, 1)
+            timed_count, timed_total = (
+                timed[index] if index < len(timed) else (0, 0))
+            dates.append(EstimatedDeliveryDate(
+                pytz.utc.localize(datetime(
+                    delivery_date.year, delivery_date.month,
+                    delivery_date.day)),
+                working_days + index,
+                timed_count * 2 > timed_total,
+                confidence))
+        return dates
+
+    def dump(self, output):
+        """ Write the recorded lanes as JSON to the file *output*. """
+        with self._lock:
+            lanes = [list(key) + [lane] for key, lane in self._lanes.items()]
+        json.dump(lanes, output)
+
+    def load(self, input_file):
+        """ Replace the recorded lanes with the ones in *input_file*. """
+        lanes = {}
+        for from_postcode, to_postcode, network_id, lane in json.load(
+                input_file):
+            lanes[(from_postcode, to_postcode, network_id)] = lane
+        with self._lock:
+            self._lanes = lanes
+
+    def __len__(self):
+        return len(self._lanes)
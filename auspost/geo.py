@@ -0,0 +1,188 @@
+import heapq
+import math
+
+from collections import defaultdict
+
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Return the great-circle distance in kilometres between two points
+    given in decimal degrees.
+    """
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def has_location(point):
+    # the API reports points without a known location as 0.0/0.0 which is
+    # in the Atlantic ocean and can't be a valid Australian location.
+    return (point.latitude is not None and point.longitude is not None
+            and (point.latitude, point.longitude) != (0.0, 0.0))
+
+
+class CollectionPointLocator(object):
+    """
+    Spatial index to find the collection points closest to a location or
+    postcode. Points are bucketed into a grid of *cell_size* degrees and a
+    query only looks at the cells around the location, expanding ring by
+    ring until no unvisited cell can contain a closer point. Postcodes are
+    indexed together with their bordering localities so that points can be
+    looked up for a postcode without knowing its coordinates.
+
+    The locator is immutable apart from ``add``, create a new one from the
+    store after syncing collection points::
+
+        locator = CollectionPointLocator(store)
+        locator.nearest(-37.81, 144.96, n=5)
+    """
+
+    def __init__(self, points=(), cell_size=0.1):
+        self.cell_size = cell_size
+
+        self._grid = defaultdict(list)
+        self._postcodes = defaultdict(list)
+        self._bordering = defaultdict(set)
+        self._bounds = None
+
+        for point in points:
+            self.add(point)
+
+    def _cell(self, latitude, longitude):
+        return (int(math.floor(latitude / self.cell_size)),
+                int(math.floor(longitude / self.cell_size)))
+
+    def add(self, point):
+        postcode = int(point.address.postcode)
+        self._postcodes[postcode].append(point)
+        for bordering in point.bordering_postcodes:
+            self._bordering[postcode].add(int(bordering))
+            self._bordering[int(bordering)].add(postcode)
+
+        if not has_location(point):
+            return
+
+        row, col = cell = self._cell(point.latitude, point.longitude)
+        self._grid[cell].append(point)
+
+        if self._bounds is None:
+            self._bounds = [row, row, col, col]
+        else:
+            bounds = self._bounds
+            bounds[0], bounds[1] = min(bounds[0], row), max(bounds[1], row)
+            bounds[2], bounds[3] = min(bounds[2], col), max(bounds[3], col)
+
+    def nearest(self, latitude, longitude, n=5, active_only=True,
+                max_distance=None):
+        """
+        Return up to *n* collection points closest to the given location,
+        ordered by distance. Only active points are returned unless
+        *active_only* is ``False``. If *max_distance* (in km) is given,
+        points further away are ignored.
+        """
+        if self._bounds is None or n <= 0:
+            return []
+
+        row, col = self._cell(latitude, longitude)
+        min_row, max_row, min_col, max_col = self._bounds
+        max_rings = max(
+            abs(row - min_row), abs(row - max_row),
+            abs(col - min_col), abs(col - max_col))
+
+        # heap of the n best candidates as (-distance, id, point)
+        best = []
+        ring = 0
+        while ring <= max_rings:
+            for cell in self._ring_cells(row, col, ring):
+                for point in self._grid.get(cell, ()):
+                    if active_only and not point.active:
+                        continue
+
+                    distance = haversine(
+                        latitude, longitude, point.latitude, point.longitude)
+                    if max_distance is not None and distance > max_distance:
+                        continue
+
+                    candidate = (-distance, point.id, point)
+                    if len(best) < n:
+                        heapq.heappush(best, candidate)
+                    elif candidate > best[0]:
+                        heapq.heapreplace(best, candidate)
+
+            # any point outside of the visited rings is at least this far
+            # away, conservatively taking the narrower longitude cells
+            # further away from the equator into account.
+            max_latitude = min(
+                89.0, abs(latitude) + (ring + 2) * self.cell_size)
+            bound = (ring * self.cell_size * KM_PER_DEGREE *
+                     math.cos(math.radians(max_latitude)))
+
+            if max_distance is not None and bound > max_distance:
+                break
+            if len(best) == n and bound > -best[0][0]:
+                break
+            ring += 1
+
+        return [point for distance, id, point in sorted(best, reverse=True)]
+
+    def _ring_cells(self, row, col, ring):
+        if ring == 0:
+            yield (row, col)
+            return
+
+        for c in range(col - ring, col + ring + 1):
+            yield (row - ring, c)
+            yield (row + ring, c)
+        for r in range(row - ring + 1, row + ring):
+            yield (r, col - ring)
+            yield (r, col + ring)
+
+    def bordering_postcodes(self, postcode):
+        return set(self._bordering.get(int(postcode), ()))
+
+    def nearest_to_postcode(self, postcode, n=5, active_only=True):
+        """
+        Return up to *n* collection points for *postcode*. If points in the
+        postcode or its bordering localities have a known location, the
+        points closest to their centre are returned. Otherwise the points
+        are taken from the postcode and then from bordering postcodes,
+        moving further out one locality at a time.
+        """
+        postcode = int(postcode)
+        visited = set([postcode])
+        level = [postcode]
+        found = []
+
+        while level and len(found) < n:
+            points = []
+            for code in level:
+                points.extend(
+                    p for p in self._postcodes.get(code, ())
+                    if p.active or not active_only)
+
+            located = [p for p in points if has_location(p)]
+            if located:
+                latitude = sum(p.latitude for p in located) / len(located)
+                longitude = sum(p.longitude for p in located) / len(located)
+                nearest = self.nearest(
+                    latitude, longitude, n=n, active_only=active_only)
+                ids = set(p.id for p in found)
+                return (found + [p for p in nearest if p.id not in ids])[:n]
+
+            found.extend(sorted(points, key=lambda p: p.id))
+
+            next_level = set()
+            for code in level:
+                next_level.update(self._bordering.get(code, ()))
+            level = sorted(next_level - visited)
+            visited.update(level)
+
+        return found[:n]
+
+    def __len__(self):
+        return sum(len(points) for points in self._postcodes.values())
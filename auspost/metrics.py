@@ -0,0 +1,194 @@
+import bisect
+import threading
+
+from collections import defaultdict
+
+
+# upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+# phases of an API call the latency is recorded for: waiting for and
+# reading the response, decoding the JSON and building the models.
+PHASES = ('network', 'decode', 'model')
+
+
+def get_error_code(exc):
+    code = getattr(exc, 'code', None)
+    if code is None:
+        return exc.__class__.__name__
+    return code
+
+
+def escape_label(value):
+    return (unicode(value).replace(u'\\', u'\\\\')
+            .replace(u'"', u'\\"').replace(u'\n', u'\\n'))
+
+
+def format_labels(labels):
+    if not labels:
+        return u''
+    return u'{%s}' % u','.join(
+        u'%s="%s"' % (name, escape_label(value)) for name, value in labels)
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return unicode(value)
+
+
+class Histogram(object):
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def get_cumulative_counts(self):
+        """
+        Return ``(upper_bound, count)`` tuples of the number of values
+        less than or equal to each bucket's upper bound.
+        """
+        total, counts = 0, []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            counts.append((bound, total))
+        return counts
+
+
+class Metrics(object):
+    """
+    Thread-safe collector of the metrics of the API calls, keyed by the
+    name of the API (e.g. ``DeliveryDates``):
+
+    * ``requests_total``: number of API calls
+    * ``errors_total``: failed calls by ``AusPostException`` code (or the
+      name of the exception class for other errors)
+    * ``latency_seconds``: histograms of the time spent in each of the
+      ``PHASES`` of a call
+    * ``response_bytes_total``: size of the response bodies
+    * ``cache_hits_total`` and ``cache_misses_total``: cache lookups
+
+    The metrics can be exported in the Prometheus text format with
+    ``to_prometheus``. Alternatively, *callback* is called with the metric
+    name, a dictionary of labels and the value for every recorded value,
+    e.g. to forward them to statsd::
+
+        api = DeliveryChoiceApi(metrics=Metrics())
+        ...
+        api.metrics.to_prometheus()
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, callback=None,
+                 prefix='auspost'):
+        self.buckets = tuple(buckets)
+        self.callback = callback
+        self.prefix = prefix
+
+        self._counters = defaultdict(int)
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def get_key(self, name, labels):
+        return (name, tuple(sorted(labels.items())))
+
+    def inc(self, name, labels, value=1):
+        key = self.get_key(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+        if self.callback is not None:
+            self.callback(name, labels, value)
+
+    def observe(self, name, labels, value):
+        key = self.get_key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+        if self.callback is not None:
+            self.callback(name, labels, value)
+
+    def record_call(self, api_name):
+        self.inc('requests_total', {'api': api_name})
+
+    def record_error(self, api_name, exc):
+        self.inc('errors_total', {
+            'api': api_name, 'code': get_error_code(exc)})
+
+    def record_latency(self, api_name, phase, seconds):
+        self.observe('latency_seconds', {'api': api_name, 'phase': phase},
+                     seconds)
+
+    def record_response_bytes(self, api_name, size):
+        self.inc('response_bytes_total', {'api': api_name}, size)
+
+    def record_cache(self, api_name, hit):
+        name = 'cache_hits_total' if hit else 'cache_misses_total'
+        self.inc(name, {'api': api_name})
+
+    def get_counter(self, name, **labels):
+        return self._counters.get(self.get_key(name, labels), 0)
+
+    def get_histogram(self, name, **labels):
+        return self._histograms.get(self.get_key(name, labels))
+
+    def get_api_names(self):
+        with self._lock:
+            keys = list(self._counters) + list(self._histograms)
+        return sorted(set(dict(labels).get('api') for name, labels in keys))
+
+    def get_cache_hit_rate(self, api_name):
+        hits = self.get_counter('cache_hits_total', api=api_name)
+        misses = self.get_counter('cache_misses_total', api=api_name)
+        if not hits + misses:
+            return 0.0
+        return float(hits) / (hits + misses)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_prometheus(self):
+        """ Return all metrics in the Prometheus text exposition format. """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (h.get_cumulative_counts(), h.sum, h.count))
+                for key, h in self._histograms.items())
+
+        lines, types = [], set()
+
+        def add_type(name, metric_type):
+            if name not in types:
+                types.add(name)
+                lines.append(u'# TYPE %s %s' % (name, metric_type))
+
+        for (name, labels), value in counters:
+            name = u'%s_%s' % (self.prefix, name)
+            add_type(name, 'counter')
+            lines.append(u'%s%s %s' % (
+                name, format_labels(labels), format_value(value)))
+
+        for (name, labels), (counts, total, count) in histograms:
+            name = u'%s_%s' % (self.prefix, name)
+            add_type(name, 'histogram')
+            for bound, cumulative in counts:
+                le = u'+Inf' if bound == float('inf') else repr(bound)
+                lines.append(u'%s_bucket%s %d' % (
+                    name, format_labels(labels + (('le', le),)), cumulative))
+            lines.append(u'%s_sum%s %r' % (name, format_labels(labels), total))
+            lines.append(u'%s_count%s %d' % (
+                name, format_labels(labels), count))
+
+        return u'\n'.join(lines) + u'\n'
@@ -0,0 +1,153 @@
+import csv
+import threading
+
+from auspost import common
+
+
+# postcode ranges of the states and territories, including the ranges
+# used for PO boxes and large volume receivers.
+POSTCODE_RANGES = (
+    ('ACT', 200, 299),
+    ('ACT', 2600, 2618),
+    ('ACT', 2900, 2920),
+    ('NSW', 1000, 2599),
+    ('NSW', 2619, 2899),
+    ('NSW', 2921, 2999),
+    ('NT', 800, 999),
+    ('QLD', 4000, 4999),
+    ('QLD', 9000, 9999),
+    ('SA', 5000, 5999),
+    ('TAS', 7000, 7999),
+    ('VIC', 3000, 3999),
+    ('VIC', 8000, 8999),
+    ('WA', 6000, 6999),
+    # localities close to a border that use a postcode of the neighbouring
+    # state or territory.
+    ('ACT', 2620, 2620),
+    ('NSW', 2611, 2611),
+    ('NSW', 3585, 3586),
+    ('NSW', 3644, 3644),
+    ('NSW', 3691, 3691),
+    ('NSW', 3707, 3707),
+    ('NSW', 4380, 4385),
+    ('QLD', 2406, 2406),
+    ('SA', 872, 872),
+    ('WA', 872, 872),
+)
+
+
+def to_postcode(postcode):
+    try:
+        return int(postcode)
+    except (TypeError, ValueError):
+        return None
+
+
+class PostcodeTable(object):
+    """
+    Offline lookup table to reject addresses and postcodes that can't be
+    valid without a request to the API. Each postcode is mapped to the
+    states it is used in based on the postcode ranges of the states.
+
+    Checking suburbs requires a table of the suburbs in each postcode,
+    which can be loaded (and later refreshed) from a CSV file with the
+    columns ``postcode``, ``suburb`` and ``state``, e.g. created from the
+    postcode data published by Australia Post::
+
+        table = PostcodeTable()
+        table.load_suburbs('postcodes.csv')
+
+    Suburbs are only checked for postcodes that are in that table.
+    """
+
+    def __init__(self, ranges=POSTCODE_RANGES, suburbs=None):
+        self._states = {}
+        for state, start, end in ranges:
+            for postcode in range(start, end + 1):
+                self._states.setdefault(postcode, set()).add(state)
+
+        self._suburbs = {}
+        self._lock = threading.Lock()
+        if suburbs:
+            self.update_suburbs(suburbs)
+
+    def get_states(self, postcode):
+        return self._states.get(to_postcode(postcode), set())
+
+    def is_valid_postcode(self, postcode):
+        return to_postcode(postcode) in self._states
+
+    def is_valid_state(self, postcode, state):
+        state = common.normalize_text(state)
+        state = common.STATE_ABBREVIATIONS.get(state, state)
+        return state in self.get_states(postcode)
+
+    def is_valid_suburb(self, postcode, suburb):
+        suburbs = self._suburbs.get(to_postcode(postcode))
+        if suburbs is None:
+            return True
+        return common.normalize_text(suburb) in suburbs
+
+    def load_suburbs(self, path_or_file):
+        """
+        Replace the suburbs with the ones in the CSV file *path_or_file*.
+        Calling this again with a newer file refreshes the table.
+        """
+        if hasattr(path_or_file, 'read'):
+            return self.update_suburbs(self._read_csv(path_or_file))
+
+        with open(path_or_file, 'rb') as csv_file:
+            return self.update_suburbs(self._read_csv(csv_file))
+
+    def _read_csv(self, csv_file):
+        for row in csv.DictReader(csv_file):
+            yield row['postcode'], row['suburb'], row.get('state')
+
+    def update_suburbs(self, suburbs):
+        """
+        Replace the suburb table with *suburbs*, an iterable of
+        ``(postcode, suburb, state)`` tuples. States of postcodes that
+        aren't covered by the postcode ranges are added as well. Returns
+        the number of postcodes with suburbs.
+        """
+        table, states = {}, {}
+        for postcode, suburb, state in suburbs:
+            postcode = to_postcode(postcode)
+            if postcode is None:
+                continue
+            table.setdefault(postcode, set()).add(
+                common.normalize_text(suburb))
+            if state:
+                states.setdefault(postcode, set()).add(
+                    common.normalize_text(state))
+
+        with self._lock:
+            self._suburbs = dict(
+                (postcode, frozenset(names))
+                for postcode, names in table.items())
+            for postcode, names in states.items():
+                self._states.setdefault(postcode, set()).update(names)
+        return len(self._suburbs)
+
+    def check_postcode(self, postcode, code):
+        """ Raise an ``AusPostException`` *code* for unknown postcodes. """
+        if not self.is_valid_postcode(postcode):
+            raise common.AusPostException(code)
+
+    def check_address(self, suburb, state, postcode, country="Australia"):
+        """
+        Raise the ``AusPostException`` the address validation API would
+        return for a postcode (1504), state (1503) or suburb (1502) that
+        can't be valid. Addresses outside of Australia are not checked.
+        """
+        if common.normalize_text(country) not in (None, 'AUSTRALIA'):
+            return
+
+        if not self.is_valid_postcode(postcode):
+            raise common.AusPostException(1504)
+
+        if not self.is_valid_state(postcode, state):
+            raise common.AusPostException(1503)
+
+        if not self.is_valid_suburb(postcode, suburb):
+            raise common.AusPostException(1502)
@@ -0,0 +1,63 @@
+"""
+Compact serialization of models, and lists of them, for external caches
+such as Redis or files. Values are stored in the format of
+``Model.to_dict`` either as msgpack, which requires the optional
+``msgpack`` package (``pip install auspost-apis[msgpack]``), or as JSON::
+
+    data = serialization.dumps(api.query_tracking(['ABC123']))
+    tracking_results = serialization.loads(data)
+
+Loading doesn't run the ``from_json`` parsers, timestamps in particular
+are restored without being parsed.
+"""
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from auspost.delivery_choice import (SERIALIZATION_VERSION, encode_value,
+                                     decode_value)
+
+
+MSGPACK = 'msgpack'
+JSON = 'json'
+
+
+def get_default_format():
+    return MSGPACK if msgpack is not None else JSON
+
+
+def dumps(value, format=None):
+    """
+    Serialize *value*, a model, a list of models or any value of plain
+    types, in the given *format* which defaults to msgpack if it is
+    installed and JSON otherwise.
+    """
+    data = {'_version': SERIALIZATION_VERSION, 'value': encode_value(value)}
+
+    format = format or get_default_format()
+    if format == MSGPACK:
+        if msgpack is None:
+            raise ImportError("msgpack is required for the msgpack format")
+        return msgpack.packb(data, use_bin_type=True)
+
+    if format == JSON:
+        return json.dumps(data, separators=(',', ':'))
+    raise ValueError("unknown format: %s" % format)
+
+
+def loads(data):
+    """ Restore a value serialized with ``dumps`` in either format. """
+    if data[:1] == b'{':
+        data = json.loads(data)
+    elif msgpack is None:
+        raise ImportError("msgpack is required to load msgpack data")
+    else:
+        data = msgpack.unpackb(data, raw=False)
+
+    version = data.get('_version')
+    if version != SERIALIZATION_VERSION:
+        raise ValueError("unsupported serialization version: %s" % version)
+    return decode_value(data['value'])
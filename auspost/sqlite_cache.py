@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from auspost import serialization
+from auspost.cache import BaseCache, get_hit_rate
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cache stored in the SQLite database at *path* that is shared by all
+    threads and processes using the same file, e.g. all workers of a web
+    server, and survives restarts::
+
+        cache = SQLiteCache('/var/cache/auspost.db')
+        api = DeliveryChoiceApi(cache=cache, cache_timeouts={
+            'ValidateAddress': 24 * 3600, 'PostcodeCapability': 3600})
+
+    The database uses write-ahead logging, so readers don't block each
+    other or the writer. Values are stored with ``serialization.dumps``
+    and must be models, lists of models or plain values. Once the cache
+    holds more than *max_entries* items, expired items and then the items
+    that expire first are removed. The size is checked every
+    *cull_frequency* writes, so the cache can temporarily hold a few more
+    items.
+
+    Entries that can't be loaded count as misses. Processes sharing a
+    file should use the same *format*, otherwise entries written in
+    msgpack are missed by processes that don't have it installed.
+
+    Hits, misses and evictions in ``stats`` are counted per instance,
+    the number of entries is the one in the database.
+    """
+
+    def __init__(self, path, max_entries=100000, timeout=300,
+                 cull_frequency=100, format=None, busy_timeout=30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.cull_frequency = cull_frequency
+        self.format = format
+        self.busy_timeout = busy_timeout
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._writes = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+            'expires REAL NOT NULL)')
+        self.execute(
+            'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)')
+
+    def _time(self):
+        return time.time()
+
+    @property
+    def connection(self):
+        """
+        The connection of the current thread. Connections are never shared
+        between threads or, after a fork, between processes.
+        """
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            connection = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None)
+            connection.text_factory = str
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection, self._local.pid = connection, pid
+        return self._local.connection
+
+    def execute(self, sql, params=()):
+        return self.connection.execute(sql, params)
+
+    def make_key(self, key):
+        return json.dumps(key, separators=(',', ':'), sort_keys=True)
+
+    def get(self, key, default=None):
+        row = self.execute(
+            'SELECT value, expires FROM cache WHERE key = ?',
+            (self.make_key(key),)).fetchone()
+
+        value = default
+        if row is not None and row[1] > self._time():
+            try:
+                # BLOBs are returned as buffers
+                value = serialization.loads(str(row[0]))
+            except Exception:
+                # written by an incompatible version or in msgpack by a
+                # process that has it installed when this one doesn't
+                row = None
+                value = default
+        else:
+            row = None
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value, timeout=None):
+        if timeout is None:
+            timeout = self.timeout
+
+        data = serialization.dumps(value, format=self.format)
+        self.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            (self.make_key(key), sqlite3.Binary(data),
+             self._time() + timeout))
+
+        with self._lock:
+            self._writes += 1
+            cull = self._writes % self.cull_frequency == 1
+        if cull or self.cull_frequency <= 1:
+            self.cull()
+
+    def cull(self):
+        """ Remove expired items and, if still too many, the oldest ones. """
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            evicted = connection.execute(
+                'DELETE FROM cache WHERE expires <= ?',
+                (self._time(),)).rowcount
+
+            excess = len(self) - self.max_entries
+            if excess > 0:
+                evicted += connection.execute(
+                    'DELETE FROM cache WHERE key IN ('
+                    'SELECT key FROM cache ORDER BY expires LIMIT ?)',
+                    (excess,)).rowcount
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+        with self._lock:
+            self.evictions += evicted
+
+    def delete(self, key):
+        self.execute('DELETE FROM cache WHERE key = ?', (self.make_key(key),))
+
+    def clear(self):
+        self.execute('DELETE FROM cache')
+
+    def close(self):
+        """ Close the connection of the current thread. """
+        if getattr(self._local, 'pid', None) == os.getpid():
+            self._local.connection.close()
+        self._local.pid = None
+
+    def __len__(self):
+        return self.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self),
+            'hit_rate': get_hit_rate(self.hits, self.misses),
+        }
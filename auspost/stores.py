@@ -0,0 +1,163 @@
+import threading
+
+from datetime import date
+
+from auspost import common
+
+
+DAY_NUMBERS = dict((name, number)
+                   for number, name in common.DAY_CODES.items())
+
+
+class PostcodeCapabilityIndex(object):
+    """
+    In-memory index of the delivery capabilities of all postcodes. Each
+    postcode is stored as its last modification date and two bitmasks of
+    the week days that standard and timed delivery are available on, so
+    that looking up a postcode is a single dictionary access.
+
+    The index is usually populated from a bulk request of all postcodes::
+
+        index = PostcodeCapabilityIndex()
+        index.refresh(api)
+        index.timed_delivery(3121, date.today())
+
+    Calling ``refresh`` again only replaces entries that have a more
+    recent ``LastModified`` date than the indexed one.
+    """
+
+    def __init__(self, capabilities=None):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.last_modified = None
+
+        if capabilities:
+            self.update(capabilities)
+
+    def refresh(self, api, postcode=None):
+        """
+        Fetch the capabilities of all postcodes (or only *postcode*) using
+        the DeliveryChoiceApi *api* and update the index with them. Returns
+        the number of entries that have been added or updated.
+        """
+        return self.update(api.postcode_capability(postcode))
+
+    def update(self, capabilities):
+        updated = 0
+        with self._lock:
+            for capability in capabilities:
+                postcode = int(capability.postcode)
+                entry = self._entries.get(postcode)
+                if entry and entry[0] >= capability.last_modified:
+                    continue
+
+                standard, timed = 0, 0
+                for day in capability.days:
+                    bit = 1 << (DAY_NUMBERS[day.name] - 1)
+                    if day.standard_delivery_enabled:
+                        standard |= bit
+                    if day.timed_delivery_enabled:
+                        timed |= bit
+
+                self._entries[postcode] = (
+                    capability.last_modified, standard, timed)
+                updated += 1
+
+                if (self.last_modified is None
+                        or capability.last_modified > self.last_modified):
+                    self.last_modified = capability.last_modified
+        return updated
+
+    def standard_delivery(self, postcode, day):
+        """
+        Return ``True`` if standard delivery is available for *postcode*
+        on *day*, which is either a date or a day number (1 = Monday).
+        Raises a ``KeyError`` for postcodes that are not in the index.
+        """
+        return self._has_capability(postcode, day, 1)
+
+    def timed_delivery(self, postcode, day):
+        """
+        Return ``True`` if timed delivery is available for *postcode* on
+        *day*, which is either a date or a day number (1 = Monday). Raises
+        a ``KeyError`` for postcodes that are not in the index.
+        """
+        return self._has_capability(postcode, day, 2)
+
+    def _has_capability(self, postcode, day, field):
+        if isinstance(day, date):
+            day = day.isoweekday()
+        if day not in common.DAY_CODES:
+            raise common.AusPostException(1101)
+
+        mask = self._entries[int(postcode)][field]
+        return bool(mask & (1 << (day - 1)))
+
+    def get_last_modified(self, postcode):
+        return self._entries[int(postcode)][0]
+
+    def __contains__(self, postcode):
+        try:
+            return int(postcode) in self._entries
+        except ValueError:
+            return False
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CollectionPointStore(object):
+    """
+    Local copy of the customer collection points, optionally restricted to
+    a *state* or *postcode*. The first ``sync`` downloads all collection
+    points, subsequent calls only request the points that changed since
+    the previous sync and merge them by their delivery point identifier.
+    """
+
+    def __init__(self, state=None, postcode=None, points=None):
+        self.state = state
+        self.postcode = postcode
+        self.last_update = None
+
+        self._points = {}
+        self._lock = threading.Lock()
+
+        if points:
+            self.update(points)
+
+    def sync(self, api, today=None):
+        """
+        Fetch the collection points that changed since the last sync using
+        the DeliveryChoiceApi *api* and merge them into the store. Returns
+        the number of points that have been added or updated.
+        """
+        # remember the date before the request is sent so that changes made
+        # while the sync is running are picked up next time.
+        today = today or date.today()
+        points = api.customer_collection_points(
+            state=self.state,
+            postcode=self.postcode,
+            last_update=self.last_update)
+        updated = self.update(points)
+        self.last_update = today
+        return updated
+
+    def update(self, points):
+        updated = 0
+        with self._lock:
+            for point in points:
+                self._points[point.id] = point
+                updated += 1
+        return updated
+
+    def get(self, id, default=None):
+        return self._points.get(unicode(id), default)
+
+    def active_points(self):
+        return [p for p in self._points.values() if p.active]
+
+    def __iter__(self):
+        return iter(self._points.values())
+
+    def __len__(self):
+        return len(self._points)
@@ -0,0 +1,217 @@
+import heapq
+import pytz
+import itertools
+import threading
+
+from datetime import datetime, timedelta
+
+
+# statuses after which an article won't get any new events
+TERMINAL_STATUSES = (
+    'Delivered',
+    'Delivered in Full',
+    'Cancelled',
+    'Returned to Sender',
+)
+
+# time until the next poll depending on the age of the latest event. An
+# article that has been moving recently is polled more often than one
+# that has been sitting somewhere for days.
+POLL_INTERVALS = (
+    (timedelta(days=1), timedelta(hours=1)),
+    (timedelta(days=3), timedelta(hours=3)),
+    (timedelta(days=7), timedelta(hours=12)),
+)
+DEFAULT_POLL_INTERVAL = timedelta(days=1)
+
+
+def utc_now():
+    return pytz.utc.localize(datetime.utcnow())
+
+
+class WatchedArticle(object):
+    __slots__ = ('tracking_id', 'next_poll', 'generation', 'status',
+                 'last_event_time', 'seen_events', 'added')
+
+    def __init__(self, tracking_id, next_poll):
+        self.tracking_id = tracking_id
+        self.next_poll = next_poll
+        # identifies the current entry of the article in the schedule
+        self.generation = None
+        self.added = next_poll
+        self.status = None
+        self.last_event_time = None
+        self.seen_events = frozenset()
+
+
+def get_event_key(event):
+    return (event.timestamp, event.description, event.location)
+
+
+class TrackingWatcher(object):
+    """
+    Keep track of a registry of tracking IDs and poll them adaptively.
+
+    Each call to ``poll`` requests the tracking IDs that are due, packed
+    into requests of 10 IDs. Partially filled requests are topped up with
+    IDs that are due within *lookahead*. The next poll of an article is
+    scheduled based on the age of its latest event (see
+    ``POLL_INTERVALS``). Articles are removed once they reach one of the
+    *terminal_statuses* or haven't had a new event for *max_idle*. Only
+    events that haven't been seen before are returned.
+    """
+
+    def __init__(self, api, poll_intervals=POLL_INTERVALS,
+                 default_poll_interval=DEFAULT_POLL_INTERVAL,
+                 terminal_statuses=TERMINAL_STATUSES,
+                 max_idle=timedelta(days=30),
+                 lookahead=timedelta(minutes=30),
+                 error_retry_interval=timedelta(minutes=15),
+                 max_workers=4):
+        self.api = api
+        self.poll_intervals = poll_intervals
+        self.default_poll_interval = default_poll_interval
+        self.terminal_statuses = terminal_statuses
+        self.max_idle = max_idle
+        self.lookahead = lookahead
+        self.error_retry_interval = error_retry_interval
+        self.max_workers = max_workers
+
+        self._articles = {}
+        self._schedule = []
+        self._generations = itertools.count()
+        self._lock = threading.Lock()
+
+    def watch(self, tracking_id, next_poll=None):
+        tracking_id = unicode(tracking_id)
+        with self._lock:
+            if tracking_id in self._articles:
+                return
+            article = WatchedArticle(tracking_id, next_poll or utc_now())
+            self._articles[tracking_id] = article
+            self._reschedule(article, article.next_poll)
+
+    def unwatch(self, tracking_id):
+        with self._lock:
+            self._articles.pop(unicode(tracking_id), None)
+
+    def __contains__(self, tracking_id):
+        return unicode(tracking_id) in self._articles
+
+    def __len__(self):
+        return len(self._articles)
+
+    def _reschedule(self, article, next_poll):
+        article.next_poll = next_poll
+        article.generation = next(self._generations)
+        heapq.heappush(self._schedule, (
+            next_poll, article.tracking_id, article.generation))
+
+    def get_due(self, now=None):
+        """
+        Remove the tracking IDs that are due at *now* from the schedule and
+        return them, topped up to fill complete requests.
+        """
+        now = now or utc_now()
+        batch_size = self.api.MAX_TRACKING_IDS
+        due = []
+
+        with self._lock:
+            while self._schedule:
+                next_poll, tracking_id, generation = self._schedule[0]
+                if next_poll > now:
+                    if not due or len(due) % batch_size == 0:
+                        break
+                    if next_poll > now + self.lookahead:
+                        break
+
+                heapq.heappop(self._schedule)
+                article = self._articles.get(tracking_id)
+                # skip entries of removed or rescheduled articles
+                if article is None or article.generation != generation:
+                    continue
+                due.append(tracking_id)
+        return due
+
+    def poll(self, now=None):
+        """
+        Request all tracking IDs that are due. Returns a list of
+        ``(tracking_result, new_events)`` tuples for the articles with new
+        events and a list of ``(tracking_ids, exception)`` tuples for
+        requests that failed and will be retried.
+        """
+        now = now or utc_now()
+        updates, errors = [], []
+
+        for chunk, results, exc in self.api.iter_query_tracking(
+                self.get_due(now), max_workers=self.max_workers):
+            if exc is not None:
+                errors.append((chunk, exc))
+                with self._lock:
+                    for tracking_id in chunk:
+                        article = self._articles.get(tracking_id)
+                        if article is not None:
+                            self._reschedule(
+                                article, now + self.error_retry_interval)
+                continue
+
+            updated = set()
+            for tracking_result in results:
+                new_events = self.update(tracking_result, now)
+                updated.add(tracking_result.id)
+                if new_events:
+                    updates.append((tracking_result, new_events))
+
+            # make sure IDs missing from the response are polled again
+            with self._lock:
+                for tracking_id in chunk:
+                    article = self._articles.get(tracking_id)
+                    if article is not None and tracking_id not in updated:
+                        self._reschedule(
+                            article, now + self.default_poll_interval)
+        return updates, errors
+
+    def update(self, tracking_result, now=None):
+        """
+        Update the watched article for *tracking_result*, schedule its next
+        poll and return the events that haven't been seen before.
+        """
+        now = now or utc_now()
+        with self._lock:
+            article = self._articles.get(tracking_result.id)
+            if article is None:
+                return []
+
+            events = []
+            if tracking_result.article is not None:
+                article.status = tracking_result.article.status
+                events = tracking_result.article.events
+
+            new_events = [e for e in events
+                          if get_event_key(e) not in article.seen_events]
+            if new_events:
+                article.seen_events = article.seen_events.union(
+                    get_event_key(e) for e in new_events)
+                latest = max(e.timestamp for e in new_events)
+                if (article.last_event_time is None
+                        or latest > article.last_event_time):
+                    article.last_event_time = latest
+
+            idle = now - (article.last_event_time or article.added)
+            if (article.status in self.terminal_statuses
+                    or idle > self.max_idle):
+                del self._articles[article.tracking_id]
+            else:
+                self._reschedule(
+                    article, now + self.get_poll_interval(article, now))
+        return new_events
+
+    def get_poll_interval(self, article, now):
+        if article.last_event_time is None:
+            return self.default_poll_interval
+
+        age = now - article.last_event_time
+        for max_age, interval in self.poll_intervals:
+            if age < max_age:
+                return interval
+        return self.default_poll_interval
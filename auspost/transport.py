@@ -0,0 +1,229 @@
+import time
+import random
+import threading
+
+from auspost import common
+
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class RateLimiter(object):
+    """
+    Thread-safe token bucket that allows *rate* requests per second with
+    bursts of up to *burst* requests. A single limiter can be shared by
+    all threads (and API instances) that use the same API credentials.
+
+    The limiter is adaptive: every throttled response (HTTP 429) halves
+    the current rate down to *min_rate* and every successful response
+    increases it again by a small fraction of *rate*.
+    """
+
+    def __init__(self, rate, burst=None, min_rate=None):
+        self.rate = float(rate)
+        # the bucket has to hold at least one token for any request to pass
+        self.burst = max(1.0, float(burst or rate))
+        self.min_rate = float(min_rate or self.rate / 10)
+        self.current_rate = self.rate
+
+        self._tokens = self.burst
+        self._updated = self._time()
+        self._lock = threading.Lock()
+
+    def _time(self):
+        return time.time()
+
+    def _sleep(self, seconds):
+        time.sleep(seconds)
+
+    def acquire(self):
+        """ Block until a request is allowed to be sent. """
+        while True:
+            with self._lock:
+                now = self._time()
+                self._tokens = min(
+                    self.burst,
+                    self._tokens + (now - self._updated) * self.current_rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.current_rate
+            self._sleep(wait)
+
+    def throttled(self):
+        with self._lock:
+            self.current_rate = max(self.min_rate, self.current_rate / 2)
+
+    def succeeded(self):
+        with self._lock:
+            self.current_rate = min(
+                self.rate, self.current_rate + self.rate / 100)
+
+
+class RetryPolicy(object):
+    """
+    Retry failed requests up to *max_retries* times. Requests are retried
+    on connection errors, timeouts and the HTTP *status_codes*, waiting a
+    random time of up to ``backoff_factor * 2 ** retry`` seconds (but not
+    more than *max_backoff*) between attempts. The random "full jitter"
+    spreads out retries of many clients failing at the same time. A
+    ``Retry-After`` header sent by the API is respected.
+    """
+
+    def __init__(self, max_retries=3, backoff_factor=0.5, max_backoff=30.0,
+                 status_codes=RETRY_STATUS_CODES):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.status_codes = status_codes
+
+    def _sleep(self, seconds):
+        time.sleep(seconds)
+
+    def is_retryable(self, response):
+        return response.status_code in self.status_codes
+
+    def get_backoff(self, retry, response=None):
+        backoff = random.uniform(
+            0, min(self.max_backoff, self.backoff_factor * 2 ** retry))
+
+        try:
+            retry_after = float(response.headers['Retry-After'])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            pass
+        else:
+            backoff = max(backoff, min(self.max_backoff, retry_after))
+        return backoff
+
+    def backoff(self, retry, response=None):
+        self._sleep(self.get_backoff(retry, response))
+
+
+class CircuitBreaker(object):
+    """
+    Stop sending requests to an unhealthy API. After *failure_threshold*
+    consecutive failures the circuit opens and requests fail immediately
+    with an ``AusPostCircuitOpenException``. Once *recovery_timeout*
+    seconds have passed, a single trial request is let through: if it
+    succeeds the circuit closes again, otherwise it stays open for
+    another *recovery_timeout* seconds.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+        self.failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def _time(self):
+        return time.time()
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._trial or (
+                self._time() - self._opened_at >= self.recovery_timeout):
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_request(self):
+        """
+        Raise ``AusPostCircuitOpenException`` unless a request may be sent.
+        Returns ``True`` if the request is the trial request of a half-open
+        circuit, which must be ended with ``end_trial``.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+
+            recovered = (
+                self._time() - self._opened_at >= self.recovery_timeout)
+            if recovered and not self._trial:
+                self._trial = True
+                return True
+        raise common.AusPostCircuitOpenException()
+
+    def end_trial(self):
+        """
+        Allow another trial request if the trial request ended without
+        recording a success or failure, e.g. because of an unexpected error.
+        """
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self._opened_at = self._time()
+                self._trial = False
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.exception = None
+
+
+class SingleFlight(object):
+    """
+    Coalesce concurrent calls with the same key: while a call for a key is
+    in flight, other callers with the same key wait for it to finish and
+    receive its result (or exception) instead of making their own call.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Call *func* with the given arguments unless a call for *key* is
+        already in flight. Returns a tuple of the result and a flag that
+        indicates whether the result is shared with another caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            in_flight = call is not None
+            if in_flight:
+                self.shared += 1
+            else:
+                self.calls += 1
+                call = self._calls[key] = _Call()
+
+        if in_flight:
+            call.event.wait()
+            if call.exception is not None:
+                raise call.exception
+            return call.result, True
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result, False
+        except Exception as exc:
+            call.exception = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
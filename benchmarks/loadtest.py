@@ -0,0 +1,167 @@
+"""
+Drive a ``DeliveryChoiceApi`` with a number of concurrent threads against
+the local fake AusPost server (or any other URL) and report throughput,
+latency percentiles and the time the client spends per phase::
+
+    python -m benchmarks.loadtest --concurrency 20 --requests 2000 \\
+        --latency 0.05 --jitter 0.02 --api query_tracking
+"""
+import sys
+import argparse
+import threading
+
+from datetime import date
+from timeit import default_timer
+from collections import defaultdict
+
+from auspost.metrics import Metrics, PHASES, get_error_code
+from auspost.delivery_choice import DeliveryChoiceApi
+
+from benchmarks.server import FakeAusPostServer, add_server_arguments
+
+
+TRACKING_IDS = ['LT%09dAU' % i for i in range(10)]
+
+# the API calls the load test can make
+CALLS = {
+    'delivery_dates': lambda api: api.delivery_dates(
+        3000, 2000, date.today(), number_of_dates=3),
+    'postcode_capability': lambda api: api.postcode_capability(3121),
+    'customer_collection_points': lambda api: (
+        api.customer_collection_points(state='VIC')),
+    'query_tracking': lambda api: api.query_tracking(TRACKING_IDS),
+    'validate_address': lambda api: api.validate_address(
+        '483 George St', 'Sydney', 'NSW', 2000),
+}
+
+
+def percentile(sorted_values, percent):
+    """ Nearest-rank percentile of a sorted list. """
+    if not sorted_values:
+        return 0.0
+    rank = int(round(percent / 100.0 * len(sorted_values) + 0.5)) - 1
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+
+class LoadTest(object):
+    """
+    Make *requests* calls of the API *call* (a function taking the API)
+    spread over *concurrency* threads that share a single API instance.
+    """
+
+    def __init__(self, api, call, concurrency, requests):
+        self.api = api
+        self.call = call
+        self.concurrency = concurrency
+        self.requests = requests
+
+        self.latencies = []
+        self.errors = defaultdict(int)
+        self.elapsed = None
+
+        self._remaining = requests
+        self._lock = threading.Lock()
+
+    def next_request(self):
+        with self._lock:
+            if self._remaining <= 0:
+                return False
+            self._remaining -= 1
+            return True
+
+    def worker(self):
+        latencies, errors = [], defaultdict(int)
+        while self.next_request():
+            start = default_timer()
+            try:
+                self.call(self.api)
+            except Exception as exc:
+                errors[get_error_code(exc)] += 1
+            latencies.append(default_timer() - start)
+
+        with self._lock:
+            self.latencies.extend(latencies)
+            for code, count in errors.items():
+                self.errors[code] += count
+
+    def run(self):
+        threads = [threading.Thread(target=self.worker)
+                   for i in range(self.concurrency)]
+        start = default_timer()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = default_timer() - start
+        self.latencies.sort()
+        return self
+
+    def report(self, output=sys.stdout):
+        latencies = self.latencies
+        output.write("requests:    %d in %.2fs (%d threads)\n" % (
+            len(latencies), self.elapsed, self.concurrency))
+        output.write("throughput:  %.1f requests/s\n" % (
+            len(latencies) / self.elapsed))
+        output.write("latency:     p50 %.1fms  p95 %.1fms  p99 %.1fms  "
+                     "max %.1fms\n" % tuple(
+                         1000 * v for v in (
+                             percentile(latencies, 50),
+                             percentile(latencies, 95),
+                             percentile(latencies, 99),
+                             latencies[-1] if latencies else 0.0)))
+        for code, count in sorted(self.errors.items()):
+            output.write("errors:      %s x %d\n" % (code, count))
+
+        metrics = self.api.metrics
+        if metrics is None:
+            return
+        for api_name in metrics.get_api_names():
+            for phase in PHASES:
+                histogram = metrics.get_histogram(
+                    'latency_seconds', api=api_name, phase=phase)
+                if histogram is None or not histogram.count:
+                    continue
+                output.write("%-12s %-9s mean %.3fms\n" % (
+                    api_name if phase == PHASES[0] else '', phase,
+                    1000 * histogram.sum / histogram.count))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--api', choices=sorted(CALLS),
+                        default='delivery_dates')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--pool-maxsize', type=int,
+                        help="connections kept per host (default: "
+                             "concurrency)")
+    parser.add_argument('--url',
+                        help="URL of a running server instead of starting "
+                             "a local fake server")
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if url is None:
+        server = FakeAusPostServer(
+            latency=args.latency, jitter=args.jitter,
+            error_rate=args.error_rate,
+            business_error_rate=args.business_error_rate,
+            seed=args.seed).start()
+        url = server.url
+
+    api = DeliveryChoiceApi(
+        pool_maxsize=args.pool_maxsize or args.concurrency, metrics=Metrics())
+    api.url = url
+    try:
+        LoadTest(api, CALLS[args.api], args.concurrency,
+                 args.requests).run().report()
+    finally:
+        api.close()
+        if server is not None:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
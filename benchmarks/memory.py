@@ -0,0 +1,122 @@
+"""
+Compare the memory used by the slot based response models with the
+equivalent ``__dict__`` based objects for the test fixtures scaled up to
+a realistic number of objects::
+
+    python -m benchmarks.memory --scale 10000
+"""
+import os
+import sys
+import copy
+import json
+import argparse
+
+from collections import defaultdict
+
+from auspost.delivery_choice import (Model, TrackingResult,
+                                     CustomerCollectionPoint,
+                                     PostcodeDeliveryCapability)
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'data')
+
+
+def load_fixture(name):
+    with open(os.path.join(DATA_DIR, '%s.json' % name)) as fixture:
+        return json.load(fixture)
+
+
+def scale_payloads(scale):
+    """
+    Return ``(parser, payload)`` tuples for the fixtures with their lists
+    repeated to contain roughly *scale* items.
+    """
+    tracking = load_fixture('tracking_article')
+    article = tracking['QueryTrackEventsResponse']['TrackingResult'][
+        'ArticleDetails']
+    article['Events']['Event'] = article['Events']['Event'] * (scale // 2)
+    article['EventCount'] = len(article['Events']['Event'])
+
+    points = load_fixture('customer_collection_points')
+    points['CustomerCollectionPoints']['CustomerCollectionPoint'] *= (
+        scale // 4)
+
+    capabilities = load_fixture('postcode_delivery_capabilities')
+    capability = capabilities['PostcodeDeliveryCapabilities'][
+        'PostcodeDeliveryCapability']
+    capabilities['PostcodeDeliveryCapabilities'][
+        'PostcodeDeliveryCapability'] = [
+            copy.deepcopy(capability) for i in range(scale // 8)]
+
+    return [
+        (TrackingResult.from_json, tracking),
+        (CustomerCollectionPoint.from_json, points),
+        (PostcodeDeliveryCapability.from_json, capabilities),
+    ]
+
+
+def iter_models(obj):
+    if isinstance(obj, list):
+        for item in obj:
+            for model in iter_models(item):
+                yield model
+    elif isinstance(obj, Model):
+        yield obj
+        for value in obj.__getstate__().values():
+            for model in iter_models(value):
+                yield model
+
+
+_dict_classes = {}
+
+
+def get_dict_size(model):
+    """
+    Size of an object with the same attributes as *model* that stores
+    them in a ``__dict__`` like the models did before using slots.
+    """
+    name = model.__class__.__name__
+    if name not in _dict_classes:
+        _dict_classes[name] = type(name, (object,), {})
+
+    obj = _dict_classes[name]()
+    obj.__dict__.update(model.__getstate__())
+    return sys.getsizeof(obj) + sys.getsizeof(obj.__dict__)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--scale', type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    counts = defaultdict(int)
+    slot_sizes = defaultdict(int)
+    dict_sizes = defaultdict(int)
+
+    for from_json, payload in scale_payloads(args.scale):
+        for model in iter_models(from_json(payload)):
+            name = model.__class__.__name__
+            counts[name] += 1
+            slot_sizes[name] += sys.getsizeof(model)
+            dict_sizes[name] += get_dict_size(model)
+
+    row = "%-28s %10s %12s %12s %12s %8s"
+    print(row % ('model', 'objects', 'bytes/dict', 'bytes/slots',
+                 'total saved', 'saving'))
+    for name in sorted(counts):
+        count = counts[name]
+        saved = dict_sizes[name] - slot_sizes[name]
+        print(row % (
+            name, count,
+            dict_sizes[name] // count, slot_sizes[name] // count,
+            saved, "%.0f%%" % (100.0 * saved / dict_sizes[name])))
+
+    total_dict = sum(dict_sizes.values())
+    total_slots = sum(slot_sizes.values())
+    print(row % (
+        'total', sum(counts.values()), '', '', total_dict - total_slots,
+        "%.0f%%" % (100.0 * (total_dict - total_slots) / total_dict)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,383 @@
+"""
+Measure the throughput and peak memory of the response parsers for
+synthetic payloads with the shapes of the API responses at a realistic
+scale::
+
+    python -m benchmarks.parsers
+    python -m benchmarks.parsers --save benchmarks/parsers_baseline.json
+    python -m benchmarks.parsers --compare benchmarks/parsers_baseline.json
+
+Every parser is run in a fresh Python process that loads the payload
+prepared by the parent with ``marshal``, so that neither building the
+payload nor other benchmarks hide the peak memory of the parser.
+Baselines are only comparable when they were recorded on the same
+machine.
+"""
+import os
+import gc
+import sys
+import json
+import random
+import marshal
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+
+from datetime import datetime, timedelta
+from timeit import default_timer
+
+from auspost.postcodes import POSTCODE_RANGES
+from auspost.delivery_choice import (DeliveryDate, TimeSlot, TrackingResult,
+                                     ValidationResult, CustomerCollectionPoint,
+                                     PostcodeDeliveryCapability)
+
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'parsers_baseline.json')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATES = ('ACT', 'NSW', 'NT', 'QLD', 'SA', 'TAS', 'VIC', 'WA')
+LOCATIONS = ('SYDNEY DC', 'MELBOURNE GPO', 'ADELAIDE BC', 'COFFS HARBOUR DC',
+             'BRISBANE MAIL CENTRE', 'PERTH AIRPORT', 'HOBART DC')
+DESCRIPTIONS = ('Transferred to', 'Onboard with driver', 'Delivered',
+                'Processed through facility', 'Attempted delivery')
+TIMEZONES = ('+10:00', '+09:30', '+08:00', '+11:00')
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday',
+            'Saturday', 'Sunday')
+
+
+def get_postcodes(count):
+    postcodes = sorted(set(
+        postcode for state, start, end in POSTCODE_RANGES
+        for postcode in range(start, end + 1)))
+    step = max(1, len(postcodes) // count)
+    return postcodes[::step][:count]
+
+
+def delivery_dates_payload(rnd, count=10):
+    lodgement = datetime(2013, 3, 1)
+    return {'DeliveryEstimateRequestResponse': {'DeliveryEstimateDates': {
+        'DeliveryEstimateDate': [
+            {'DeliveryDate': (lodgement + timedelta(days=i + 1)).strftime(
+                '%Y-%m-%d'),
+             'NumberOfWorkingDays': i + 1,
+             'TimedDeliveryEnabled': rnd.random() < 0.5}
+            for i in range(count)]}}}
+
+
+def timeslots_payload(rnd):
+    return {'DeliveryTimeslots': {'DayTimeslot': [
+        {'Weekday': i + 1,
+         'WeekdayDescription': name,
+         'TimePeriod': [
+             {'StartTime': '07:00:00', 'EndTime': '12:00:00',
+              'Duration': 'PT5H', 'TimePeriodName': 'AM'},
+             {'StartTime': '12:00:00', 'EndTime': '17:00:00',
+              'Duration': 'PT5H', 'TimePeriodName': 'PM'}]}
+        for i, name in enumerate(WEEKDAYS)]}}
+
+
+def tracking_payload(rnd, events):
+    timestamp = datetime(2013, 3, 1, 8, 0)
+    event_list = []
+    for i in range(events):
+        timestamp -= timedelta(seconds=rnd.randint(60, 3600))
+        event_list.append({
+            'EventDescription': rnd.choice(DESCRIPTIONS),
+            'EventDateTime': timestamp.strftime('%Y-%m-%dT%H:%M:%S') +
+            rnd.choice(TIMEZONES),
+            'Location': rnd.choice(LOCATIONS)})
+
+    return {'QueryTrackEventsResponse': {'TrackingResult': {
+        'TrackingID': 'ABC123',
+        'ArticleDetails': {
+            'ArticleID': 'ABC123',
+            'EventNotification': '00',
+            'ProductName': 'Express Post',
+            'Status': 'In transit',
+            'EventCount': events,
+            'Events': {'Event': event_list}}}}}
+
+
+def capabilities_payload(rnd, postcodes):
+    modified = datetime(2011, 7, 29, 14, 5, 50)
+    return {'PostcodeDeliveryCapabilities': {'PostcodeDeliveryCapability': [
+        {'Postcode': postcode,
+         'WeekDay': [
+             {'DayType': day,
+              'StandardDeliveryEnabled': day < 6 or rnd.random() < 0.2,
+              'TimedDeliveryEnabled': day < 6 and rnd.random() < 0.3}
+             for day in range(1, 8)],
+         'LastModified': (modified + timedelta(
+             minutes=rnd.randint(0, 60 * 24 * 365))).strftime(
+                 '%Y-%m-%dT%H:%M:%S.000+10:00')}
+        for postcode in get_postcodes(postcodes)]}}
+
+
+def collection_points_payload(rnd, points):
+    postcodes = get_postcodes(points)
+    items = []
+    for i in range(points):
+        postcode = postcodes[i % len(postcodes)]
+        items.append({
+            'DeliveryPointIdentifier': 10000000 + i,
+            'ServiceCode': '0107',
+            'ServiceDescription': 'UPL',
+            'CustomerCollectionPointName': 'Collection point %d' % i,
+            'Active': rnd.random() < 0.95,
+            'LocationInstructions': 'collect',
+            'CustomerAccessSummary': 'Mon - Fri: 9am - 5pm',
+            'Address': {
+                'AddressLine': [i % 200 + 1, 'Main Street', 'Shop %d' % i],
+                'SuburbOrPlaceOrLocality': 'SUBURB %d' % postcode,
+                'StateOrTerritory': rnd.choice(STATES),
+                'PostCode': postcode,
+                'DeliveryPointIdentifier': 10000000 + i,
+                'Country': {'CountryCode': 'AU', 'CountryName': 'AU'}},
+            'BorderingLocalityPostcode': [postcode + 1, postcode + 2],
+            'Latitude': '%.6f' % rnd.uniform(-43.0, -10.0),
+            'Longitude': '%.6f' % rnd.uniform(113.0, 153.0),
+            'NumberofLockers': rnd.randint(0, 40)})
+    return {'CustomerCollectionPoints': {'CustomerCollectionPoint': items}}
+
+
+def validation_payload(rnd):
+    return {'ValidateAustralianAddressResponse': {
+        'Address': {
+            'AddressLine': '%d GEORGE ST' % rnd.randint(1, 999),
+            'SuburbOrPlaceOrLocality': 'SYDNEY',
+            'StateOrTerritory': 'NSW',
+            'PostCode': 2000,
+            'DeliveryPointIdentifier': 57414158,
+            'Country': {'CountryCode': 'AU', 'CountryName': 'Australia'}},
+        'ValidAustralianAddress': True}}
+
+
+def get_benchmarks(args):
+    """
+    Return ``(name, parser, create_payload, items)`` tuples where *items*
+    is the number of models a single payload is parsed into.
+    """
+    return [
+        ('DeliveryDate', DeliveryDate.from_json, delivery_dates_payload,
+         10),
+        ('TimeSlot', TimeSlot.from_json, timeslots_payload, 7),
+        ('ValidationResult', ValidationResult.from_json,
+         validation_payload, 1),
+        ('TrackingResult', TrackingResult.from_json,
+         lambda rnd: tracking_payload(rnd, args.events), args.events),
+        ('PostcodeDeliveryCapability', PostcodeDeliveryCapability.from_json,
+         lambda rnd: capabilities_payload(rnd, args.postcodes),
+         args.postcodes),
+        ('CustomerCollectionPoint', CustomerCollectionPoint.from_json,
+         lambda rnd: collection_points_payload(rnd, args.points),
+         args.points),
+        # reloading results stored with to_dict, e.g. in a cache
+        ('TrackingResult.from_dict',
+         lambda data: [TrackingResult.from_dict(item) for item in data],
+         lambda rnd: [result.to_dict() for result in TrackingResult.from_json(
+             tracking_payload(rnd, args.events))],
+         args.events),
+    ]
+
+
+def get_max_rss():
+    """ Peak resident set size of the current process in bytes. """
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return max_rss
+    return max_rss * 1024
+
+
+def measure(parser, payload, items, min_time=0.2, repeat=3,
+            memory_items=10000):
+    """
+    Measure the peak memory per call of *parser* and the fastest time of
+    *repeat* rounds of calls. Small payloads are parsed repeatedly while
+    keeping the results until about *memory_items* models were created,
+    because the peak memory only grows in whole pages. The peak memory is
+    only meaningful if *payload* was created without temporary objects,
+    see ``run_child``.
+    """
+    calls = max(1, memory_items // items)
+    gc.collect()
+    before = get_max_rss()
+    results = [parser(payload) for i in range(calls)]
+    peak_memory = (get_max_rss() - before) // calls
+    del results
+
+    # parse the payload often enough to run for at least *min_time* and
+    # take the fastest of *repeat* runs.
+    number, best = 1, None
+    while True:
+        start = default_timer()
+        for i in range(number):
+            parser(payload)
+        elapsed = default_timer() - start
+        if best is None and elapsed < min_time:
+            number *= 2
+            continue
+
+        best = elapsed if best is None else min(best, elapsed)
+        repeat -= 1
+        if repeat <= 0:
+            break
+
+    return {
+        'items': items,
+        'items_per_second': items * number / best,
+        'seconds_per_call': best / number,
+        'peak_memory': peak_memory,
+    }
+
+
+def run_in_subprocess(name, create_payload, items, seed):
+    """
+    Run the benchmark *name* on the payload created by *create_payload* in
+    a new Python process and return its result.
+    """
+    fd, payload_path = tempfile.mkstemp(suffix='.marshal')
+    try:
+        with os.fdopen(fd, 'wb') as payload_file:
+            marshal.dump(create_payload(random.Random(seed)), payload_file)
+
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'benchmarks.parsers',
+             '--child', name, payload_path, str(items)],
+            cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        output, errors = process.communicate()
+    finally:
+        os.remove(payload_path)
+
+    if process.returncode:
+        return {'error': errors.strip().splitlines()[-1:]}
+    return json.loads(output)
+
+
+def run_child(args):
+    """
+    Measure a single benchmark in this process and print the result as
+    JSON. Loading the payload with ``marshal`` creates hardly any
+    temporary objects, so the peak memory grows with the parser's
+    allocations only.
+    """
+    name, payload_path, items = args.child
+    parsers = dict((benchmark[0], benchmark[1])
+                   for benchmark in get_benchmarks(args))
+    with open(payload_path, 'rb') as payload_file:
+        payload = marshal.load(payload_file)
+
+    result = measure(parsers[name], payload, int(items))
+    sys.stdout.write(json.dumps(result))
+    return 0
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return '%.0f %s' % (size, unit)
+        size /= 1024.0
+    return '%.1f GB' % size
+
+
+def compare(results, baseline, tolerance):
+    """
+    Return the names of the benchmarks that got slower or use more memory
+    than the *baseline* by more than *tolerance* (a fraction).
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+
+        base = baseline[name]
+        speed = result['items_per_second'] / base['items_per_second'] - 1
+        memory = result['peak_memory'] - base['peak_memory']
+        memory_change = float(memory) / max(base['peak_memory'], 1)
+
+        regressed = (speed < -tolerance or (
+            memory_change > tolerance and memory > 1024 * 1024))
+        if regressed:
+            regressions.append(name)
+        print("%-28s %+7.1f%% throughput %+12s memory%s" % (
+            name, 100 * speed, format_size(memory),
+            '  REGRESSION' if regressed else ''))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--events', type=int, default=10000,
+                        help="number of events of the tracked article")
+    parser.add_argument('--postcodes', type=int, default=3300,
+                        help="number of postcodes with capabilities")
+    parser.add_argument('--points', type=int, default=4500,
+                        help="number of collection points")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', action='append',
+                        help="only run the benchmarks with this name")
+    parser.add_argument('--save', metavar='PATH',
+                        help="save the results as baseline")
+    parser.add_argument('--compare', metavar='PATH', nargs='?',
+                        const=BASELINE,
+                        help="compare the results with a saved baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed slowdown before reporting a "
+                             "regression (default 0.2)")
+    parser.add_argument('--child', nargs=3, metavar=('NAME', 'PAYLOAD',
+                                                     'ITEMS'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        return run_child(args)
+
+    parameters = {'events': args.events, 'postcodes': args.postcodes,
+                  'points': args.points, 'seed': args.seed}
+
+    row = "%-28s %8s %16s %14s %12s"
+    print(row % ('parser', 'items', 'items/s', 'ms/call', 'peak memory'))
+
+    results = {}
+    for name, _, create_payload, items in get_benchmarks(args):
+        if args.only and name not in args.only:
+            continue
+
+        result = run_in_subprocess(name, create_payload, items, args.seed)
+        if 'error' in result:
+            print("%-28s failed: %s" % (name, result['error']))
+            continue
+
+        results[name] = result
+        print(row % (
+            name, items, '%.0f' % result['items_per_second'],
+            '%.3f' % (1000 * result['seconds_per_call']),
+            format_size(result['peak_memory'])))
+
+    if args.save:
+        with open(args.save, 'w') as output:
+            json.dump({
+                'python': platform.python_version(),
+                'parameters': parameters,
+                'results': results,
+            }, output, indent=2, sort_keys=True, separators=(',', ': '))
+            output.write('\n')
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        print('')
+        if baseline['python'] != platform.python_version():
+            print("warning: baseline was recorded with Python %s" %
+                  baseline['python'])
+        if baseline['parameters'] != parameters:
+            print("warning: baseline was recorded with %s" %
+                  baseline['parameters'])
+        regressions = compare(results, baseline['results'], args.tolerance)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Local stand-in for the AusPost APIs that serves the responses of the test
+fixtures for every API path, e.g. ``/DeliveryDates.json``, with
+configurable latency, HTTP errors and business exceptions::
+
+    python -m benchmarks.server --port 8000 --latency 0.05 --error-rate 0.01
+
+Point an API at it by setting its URL::
+
+    api = DeliveryChoiceApi()
+    api.url = 'http://127.0.0.1:8000'
+"""
+import os
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+import threading
+
+from urlparse import urlparse, parse_qs
+from SocketServer import ThreadingMixIn
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'data')
+
+# fixture served for each API and the code of the business exception
+# that is injected for it.
+FIXTURES = {
+    'DeliveryDates': ('delivery_dates', 1001),
+    'DeliveryTimeslots': ('delivery_timeslots', 1101),
+    'PostcodeCapability': ('postcode_delivery_capabilities', 1201),
+    'CustomerCollectionPoints': ('customer_collection_points', 1301),
+    'QueryTracking': ('tracking_article', 1401),
+    'ValidateAddress': ('validate_australian_address', 1502),
+}
+
+
+def load_fixture(name):
+    with open(os.path.join(DATA_DIR, '%s.json' % name)) as fixture:
+        return json.load(fixture)
+
+
+class FakeAusPostHandler(BaseHTTPRequestHandler):
+    # keep connections alive to exercise the client's connection pool and
+    # send each response in one go to avoid delayed ACKs.
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    wbufsize = -1
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        api_name = url.path.strip('/').rsplit('.', 1)[0]
+
+        server.record_request(api_name)
+        if server.latency or server.jitter:
+            time.sleep(server.latency + server.random(0, server.jitter))
+
+        if api_name not in server.responses:
+            return self.send_json(404, {'error': 'Unknown API'})
+
+        if server.random() < server.error_rate:
+            return self.send_json(503, {'error': 'Service unavailable'})
+
+        if server.random() < server.business_error_rate:
+            return self.send_body(
+                200, server.business_exceptions[api_name])
+
+        if api_name == 'QueryTracking':
+            tracking_ids = parse_qs(url.query).get('q', [''])[0].split(',')
+            return self.send_json(200, server.get_tracking(tracking_ids))
+
+        self.send_body(200, server.responses[api_name])
+
+    def send_json(self, status, data):
+        self.send_body(status, json.dumps(data))
+
+    def send_body(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+
+class FakeAusPostServer(ThreadingMixIn, HTTPServer):
+    """
+    Threaded HTTP server that answers requests for the AusPost APIs with
+    the fixture responses. Every request is delayed by *latency* plus a
+    random *jitter* (both in seconds), fails with HTTP 503 with a
+    probability of *error_rate* and returns a ``BusinessException`` with
+    a probability of *business_error_rate*. Pass port ``0`` to pick a
+    free port::
+
+        server = FakeAusPostServer(latency=0.05).start()
+        ...
+        server.stop()
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, business_error_rate=0.0, seed=None,
+                 verbose=False):
+        HTTPServer.__init__(self, (host, port), FakeAusPostHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.business_error_rate = business_error_rate
+        self.verbose = verbose
+
+        self.responses, self.business_exceptions = {}, {}
+        for api_name, (fixture, code) in FIXTURES.items():
+            data = load_fixture(fixture)
+            self.responses[api_name] = json.dumps(data)
+            self.business_exceptions[api_name] = json.dumps(
+                {data.keys()[0]: {'BusinessException': {
+                    'Code': code,
+                    'Description': 'Injected business exception'}}})
+        self.article = load_fixture('tracking_article')[
+            'QueryTrackEventsResponse']['TrackingResult']['ArticleDetails']
+
+        self.requests = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    def random(self, a=0.0, b=1.0):
+        with self._lock:
+            return self._random.uniform(a, b)
+
+    def record_request(self, api_name):
+        with self._lock:
+            self.requests[api_name] = self.requests.get(api_name, 0) + 1
+
+    def get_tracking(self, tracking_ids):
+        results = []
+        for tracking_id in tracking_ids:
+            article = copy.deepcopy(self.article)
+            article['ArticleID'] = tracking_id
+            results.append(
+                {'TrackingID': tracking_id, 'ArticleDetails': article})
+        return {'QueryTrackEventsResponse': {'TrackingResult': results}}
+
+    def start(self):
+        """ Serve requests on a background thread. """
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def add_server_arguments(parser):
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="seconds every response is delayed")
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help="maximum random extra delay in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="fraction of requests failing with HTTP 503")
+    parser.add_argument('--business-error-rate', type=float, default=0.0,
+                        help="fraction of requests returning a "
+                             "BusinessException")
+    parser.add_argument('--seed', type=int)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = FakeAusPostServer(
+        args.host, args.port, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate,
+        business_error_rate=args.business_error_rate, seed=args.seed,
+        verbose=True)
+    sys.stderr.write("Serving the AusPost APIs on %s\n" % server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
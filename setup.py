@@ -12,14 +12,21 @@ setup(
     keywords="wrapper, logistics, delivery, post, Australia",
     license='BSD',
     platforms=['linux'],
-    packages=find_packages(exclude=["sandbox*", "tests*"]),
+    packages=find_packages(exclude=["sandbox*", "tests*", "benchmarks*"]),
     include_package_data=True,
     install_requires=[
         'versiontools>=1.9.1',
-        'requests>=1.0.2',
+        'requests>=1.2.0',
         'python-dateutil>=2.1',
         'pytz>=2012d',
+        'futures>=2.1.3',
     ],
+    extras_require={
+        'msgpack': ['msgpack>=0.6'],
+    },
+    entry_points={
+        'console_scripts': ['auspost = auspost.cli:main'],
+    },
     # See http://pypi.python.org/pypi?%3Aaction=list_classifiers
     classifiers=[
       'Environment :: Web Environment',
@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+from auspost.cache import LocMemCache
+
+
+class TestLocMemCache(TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = LocMemCache(max_entries=2, timeout=60)
+        self.cache._time = lambda: self.now
+
+    def test_items_expire_after_timeout(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2, timeout=10)
+        self.now += 30
+
+        self.assertEquals(self.cache.get('a'), 1)
+        self.assertEquals(self.cache.get('b'), None)
+
+    def test_least_recently_used_item_is_evicted(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+
+        self.assertEquals(self.cache.get('a'), 1)
+        self.assertEquals(self.cache.get('b'), None)
+        self.assertEquals(self.cache.get('c'), 3)
+        self.assertEquals(self.cache.evictions, 1)
+
+    def test_stats_count_hits_and_misses(self):
+        self.cache.set('a', 1)
+        self.cache.get('a')
+        self.cache.get('a')
+        self.cache.get('b')
+
+        stats = self.cache.stats()
+        self.assertEquals(stats['hits'], 2)
+        self.assertEquals(stats['misses'], 1)
+        self.assertEquals(stats['entries'], 1)
+        self.assertAlmostEqual(stats['hit_rate'], 2 / 3.0)
@@ -0,0 +1,85 @@
+import os
+import json
+
+from StringIO import StringIO
+from unittest import TestCase
+
+from auspost import cli
+from auspost.delivery_choice import DeliveryChoiceApi
+
+from tests.delivery_choice_tests import TrackingSession, AddressSession
+
+
+def read_records(output):
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+class TestTrackCommand(TestCase):
+
+    def setUp(self):
+        self.api = DeliveryChoiceApi()
+        self.session = TrackingSession()
+        self.api._session, self.api._session_pid = self.session, os.getpid()
+
+    def test_records_are_written_for_every_tracking_id(self):
+        input_file = StringIO(
+            '\n'.join(['ID%02d' % i for i in range(12)] + ['BAD1', '']))
+        output = StringIO()
+
+        errors = cli.track(
+            self.api, cli.read_tracking_ids(input_file), output)
+        records = read_records(output)
+
+        self.assertEquals(errors, 3)
+        self.assertEquals(
+            [r['tracking_id'] for r in records],
+            ['ID%02d' % i for i in range(12)] + ['BAD1'])
+        self.assertEquals(records[0]['result']['article']['id'], 'ID00')
+        self.assertEquals(records[-1]['error']['code'], 1401)
+
+    def test_tracking_ids_missing_from_response_get_error_record(self):
+        get = self.session.get
+
+        def get_without_missing(url, params=None, **kwargs):
+            params = dict(params, q=params['q'].replace(',MISSING', ''))
+            return get(url, params, **kwargs)
+        self.session.get = get_without_missing
+
+        output = StringIO()
+        errors = cli.track(self.api, [u'A', u'MISSING', u'B'], output)
+        records = read_records(output)
+
+        self.assertEquals(errors, 1)
+        self.assertEquals(
+            [r['tracking_id'] for r in records], ['A', 'B', 'MISSING'])
+        self.assertEquals(records[-1]['error']['code'], 'MissingResult')
+
+
+class TestValidateCommand(TestCase):
+
+    def setUp(self):
+        with open('tests/data/valid_address.json') as fixture:
+            valid_address = json.load(fixture)
+        self.api = DeliveryChoiceApi()
+        self.session = AddressSession(valid_address)
+        self.api._session, self.api._session_pid = self.session, os.getpid()
+
+    def test_csv_rows_are_validated(self):
+        input_file = StringIO(
+            'line1,suburb,state,postcode,comment\n'
+            '109/175 Sturt St,Southbank,VIC,3006,office\n'
+            '1 Main St,Nowhere,XX,3006,\n')
+        output = StringIO()
+
+        errors = cli.validate(
+            self.api, cli.read_addresses(input_file), output)
+        records = read_records(output)
+
+        self.assertEquals(errors, 1)
+        self.assertEquals(records[0]['address'], {
+            'line1': '109/175 Sturt St', 'suburb': 'Southbank',
+            'state': 'VIC', 'postcode': '3006'})
+        self.assertEquals(records[0]['result']['is_valid'], True)
+        self.assertEquals(
+            records[0]['result']['address']['postcode'], 3006)
+        self.assertEquals(records[1]['error']['code'], 1503)
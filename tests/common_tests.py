@@ -0,0 +1,138 @@
+import json
+import pytz
+import time
+
+from datetime import datetime
+from unittest import TestCase
+
+from auspost import common
+
+
+class TestGetAwareUtcDatetime(TestCase):
+
+    def test_fast_path_matches_generic_parser(self):
+        for datetime_str in ['2011-04-11',
+                             '2011-09-04T12:14:22+10:00',
+                             '2010-07-06T10:57:53+09:30',
+                             '2011-07-29T14:05:50.000+10:00',
+                             '2011-07-29T14:05:50.123456-03:00',
+                             '2011-07-29T04:05:50Z',
+                             '2011-07-29T04:05:50',
+                             '2011-07-29 04:05']:
+            self.assertTrue(common.ISO_DATETIME_RE.match(datetime_str))
+
+            dt = common.get_aware_utc_datetime(datetime_str)
+            expected = common.parse_aware_utc_datetime(datetime_str)
+            self.assertEquals(dt, expected)
+            self.assertEquals(dt.tzinfo, pytz.utc)
+
+    def test_unknown_formats_fall_back_to_generic_parser(self):
+        dt = common.get_aware_utc_datetime('29 July 2011 14:05 +1000')
+        self.assertEquals(dt, pytz.utc.localize(datetime(2011, 7, 29, 4, 5)))
+
+    def test_converting_multiple_timestamps(self):
+        dts = common.get_aware_utc_datetimes(
+            ['2011-04-11', '2011-04-12T10:00:00+10:00', '2011-04-11'])
+        self.assertEquals(dts, [
+            pytz.utc.localize(datetime(2011, 4, 11)),
+            pytz.utc.localize(datetime(2011, 4, 12)),
+            pytz.utc.localize(datetime(2011, 4, 11))])
+
+
+class TestSecondsUntilMidnight(TestCase):
+
+    def test_midnight_is_calculated_in_auspost_timezone(self):
+        # 22:00 in Sydney during daylight saving time (UTC+11)
+        now = pytz.utc.localize(datetime(2013, 1, 10, 11, 0, 0))
+        self.assertEquals(common.seconds_until_midnight(now=now), 7200)
+
+
+class TestNormalizeAddress(TestCase):
+
+    def test_similar_addresses_have_same_key(self):
+        self.assertEquals(
+            common.normalize_address(
+                '109/175  Sturt St ', 'southbank', 'Victoria', 3006),
+            common.normalize_address(
+                '109/175 STURT ST', 'Southbank', ' vic', '3006',
+                country='australia'))
+
+    def test_postcodes_are_padded(self):
+        key = common.normalize_address('1 Smith St', 'Darwin', 'NT', 800)
+        self.assertEquals(
+            key, ('1 SMITH ST', 'DARWIN', 'NT', '0800', None, 'AUSTRALIA'))
+
+
+class TestChunked(TestCase):
+
+    def test_splitting_iterable_into_chunks(self):
+        chunks = list(common.chunked(iter(range(23)), 10))
+        self.assertEquals([len(c) for c in chunks], [10, 10, 3])
+        self.assertEquals(sum(chunks, []), list(range(23)))
+
+    def test_empty_iterable_returns_no_chunks(self):
+        self.assertEquals(list(common.chunked([], 10)), [])
+
+
+class TestBoundedMap(TestCase):
+
+    def test_results_are_returned_in_input_order(self):
+        def func(item):
+            time.sleep(0.001 * (10 - item))
+            return item * 2
+
+        results = list(common.bounded_map(func, range(10), max_workers=4))
+        self.assertEquals(
+            [(i, i * 2, None) for i in range(10)], results)
+
+    def test_exceptions_are_collected_per_item(self):
+        def func(item):
+            if item == 2:
+                raise common.AusPostException(1401)
+            return item
+
+        results = list(common.bounded_map(func, range(4), max_workers=2))
+        self.assertEquals([r[1] for r in results], [0, 1, None, 3])
+        self.assertEquals(results[2][2].code, 1401)
+
+
+def iter_chunks(data, size):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+class TestIterJsonArray(TestCase):
+
+    def test_items_are_parsed_from_small_chunks(self):
+        items = [{'Postcode': 3000 + i, 'Name': u'M\xfcnster %d' % i}
+                 for i in range(20)]
+        data = json.dumps({'Response': {'Item': items}}, indent=2)
+
+        for size in [1, 7, 64, len(data)]:
+            parsed = list(common.iter_json_array(
+                iter_chunks(data.encode('utf-8'), size), 'Item'))
+            self.assertEquals(parsed, items)
+
+    def test_numbers_split_across_chunks_are_parsed(self):
+        data = '{"K": [12345, 678, true, null, 1.5e3]}'
+        for size in [1, 2, 3]:
+            self.assertEquals(
+                list(common.iter_json_array(iter_chunks(data, size), 'K')),
+                [12345, 678, True, None, 1500.0])
+
+    def test_single_object_is_parsed_as_only_item(self):
+        data = '{"Response": {"Item": {"Postcode": 3000}}}'
+        self.assertEquals(
+            list(common.iter_json_array(iter_chunks(data, 5), 'Item')),
+            [{'Postcode': 3000}])
+
+    def test_missing_key_yields_nothing(self):
+        data = '{"Response": {"Items": []}}'
+        self.assertEquals(
+            list(common.iter_json_array(iter_chunks(data, 5), 'Item')), [])
+
+    def test_truncated_data_raises_value_error(self):
+        data = '{"Response": {"Item": [{"Postcode": 3000}, {"Postco'
+        items = common.iter_json_array(iter_chunks(data, 5), 'Item')
+        self.assertEquals(next(items), {'Postcode': 3000})
+        self.assertRaises(ValueError, next, items)
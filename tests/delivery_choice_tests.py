@@ -1,9 +1,16 @@
+import os
 import json
 import pytz
+import time
+import pickle
+import threading
 
 from datetime import date, datetime, timedelta
 from unittest import TestCase
 
+from auspost.cache import LocMemCache
+from auspost.metrics import Metrics
+from auspost.transport import RetryPolicy, CircuitBreaker
 from auspost.delivery_choice import *  # noqa
 
 
@@ -17,6 +24,619 @@ class AuspostTestCase(TestCase):
             setattr(self, fixture.lower(), json_data)
 
 
+class FakeResponse(object):
+
+    def __init__(self, json_data, status_code=200, reason='OK'):
+        self.content = json.dumps(json_data)
+        self.status_code = status_code
+        self.reason = reason
+
+    def json(self):
+        raise AssertionError("responses are decoded by the API")
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeSession(object):
+
+    def __init__(self, responses=None):
+        self.responses = list(responses or [])
+        self.requests = []
+        self.closed = False
+
+    def get(self, url, params=None, **kwargs):
+        self.requests.append((url, params))
+        return self.responses.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+class TrackingSession(FakeSession):
+    """
+    Fake session that creates a tracking response for the requested IDs.
+    IDs starting with ``BAD`` cause a business exception for the request.
+    """
+
+    def get(self, url, params=None, **kwargs):
+        self.requests.append((url, params))
+        tracking_ids = params['q'].split(',')
+
+        if [i for i in tracking_ids if i.startswith('BAD')]:
+            return FakeResponse({'QueryTrackEventsResponse': {
+                'BusinessException': {
+                    'Code': 1401, 'Description': 'Invalid tracking ID'}}})
+
+        return FakeResponse({'QueryTrackEventsResponse': {
+            'TrackingResult': [
+                {'TrackingID': i,
+                 'ArticleDetails': {'ArticleID': i, 'EventCount': 0}}
+                for i in tracking_ids]}})
+
+
+class AddressSession(FakeSession):
+    """
+    Fake session that validates every address except those with the state
+    ``XX`` which cause a business exception.
+    """
+
+    def __init__(self, valid_address):
+        super(AddressSession, self).__init__()
+        self.valid_address = valid_address
+
+    def get(self, url, params=None, **kwargs):
+        self.requests.append((url, params))
+        if params['state'] == 'XX':
+            return FakeResponse({'ValidateAustralianAddressResponse': {
+                'BusinessException': {
+                    'Code': 1503, 'Description': 'Invalid state'}}})
+        return FakeResponse(self.valid_address)
+
+
+class TestDeliveryChoiceSession(TestCase):
+
+    def setUp(self):
+        self.api = DeliveryChoiceApi()
+        self.sessions = []
+
+        def create_session():
+            session = FakeSession([FakeResponse({}), FakeResponse({})])
+            self.sessions.append(session)
+            return session
+
+        self.api.create_session = create_session
+
+    def test_session_is_reused_between_requests(self):
+        self.api.send_request('QueryTracking', params={'q': '1'})
+        self.api.send_request('QueryTracking', params={'q': '2'})
+        self.assertEquals(len(self.sessions), 1)
+        self.assertEquals(len(self.sessions[0].requests), 2)
+
+    def test_session_is_recreated_after_fork(self):
+        session = self.api.session
+        # pretend that we are running in a forked child process
+        self.api._session_pid = -1
+        self.assertNotEqual(self.api.session, session)
+        self.assertFalse(session.closed)
+
+    def test_context_manager_closes_session(self):
+        with self.api as api:
+            session = api.session
+        self.assertTrue(session.closed)
+        self.assertEquals(self.api._session, None)
+
+    def test_default_session_uses_pool_settings(self):
+        api = DeliveryChoiceApi(pool_maxsize=25)
+        session = api.create_session()
+        adapter = session.get_adapter('https://api.auspost.com.au')
+        self.assertEquals(adapter._pool_maxsize, 25)
+        self.assertEquals(session.cookies.get('OBBasicAuth'), 'fromDialog')
+
+
+class TestAsyncDeliveryChoiceApi(AuspostTestCase):
+    fixtures = ['tracking_article']
+
+    def setUp(self):
+        super(TestAsyncDeliveryChoiceApi, self).setUp()
+        self.api = AsyncDeliveryChoiceApi(max_workers=2)
+        self.api._session = FakeSession([FakeResponse(self.tracking_article)])
+        self.api._session_pid = os.getpid()
+
+    def tearDown(self):
+        self.api.close()
+
+    def test_query_tracking_returns_future_with_parsed_result(self):
+        future = self.api.query_tracking(['1234'])
+        tracking_results = future.result(timeout=5)
+        self.assertEquals(len(tracking_results), 1)
+        self.assertEquals(tracking_results[0].id, '1234')
+
+    def test_validation_errors_are_raised_by_the_future(self):
+        future = self.api.delivery_dates('abcde', 3000, date.today())
+        try:
+            future.result(timeout=5)
+        except common.AusPostException as exc:
+            self.assertEquals(exc.code, 1001)
+        else:
+            self.fail("no exception raised for invalid 'from_postcode'")
+
+
+class TestTransport(AuspostTestCase):
+    fixtures = ['tracking_article']
+
+    def setUp(self):
+        super(TestTransport, self).setUp()
+        self.backoffs = []
+        self.retry_policy = RetryPolicy(max_retries=2)
+        self.retry_policy._sleep = self.backoffs.append
+        self.circuit_breaker = CircuitBreaker(failure_threshold=3)
+
+        self.api = DeliveryChoiceApi(
+            retry_policy=self.retry_policy,
+            circuit_breaker=self.circuit_breaker)
+        self.session = FakeSession()
+        self.api._session, self.api._session_pid = self.session, os.getpid()
+
+    def test_server_errors_are_retried(self):
+        self.session.responses = [
+            FakeResponse(None, 503, 'Service Unavailable'),
+            FakeResponse(None, 429, 'Too Many Requests'),
+            FakeResponse(self.tracking_article)]
+
+        tracking_results = self.api.query_tracking(['1234'])
+        self.assertEquals(tracking_results[0].id, '1234')
+        self.assertEquals(len(self.backoffs), 2)
+        self.assertEquals(self.circuit_breaker.failures, 0)
+
+    def test_exception_is_raised_when_retries_are_exhausted(self):
+        self.session.responses = [
+            FakeResponse(None, 500, 'Server Error') for i in range(3)]
+        try:
+            self.api.query_tracking(['1234'])
+        except common.AusPostHttpException as exc:
+            self.assertEquals(exc.code, 500)
+        else:
+            self.fail("no exception raised for server error")
+
+        self.assertEquals(len(self.session.requests), 3)
+        self.assertEquals(self.circuit_breaker.state, CircuitBreaker.OPEN)
+        self.assertRaises(
+            common.AusPostCircuitOpenException,
+            self.api.query_tracking, ['1234'])
+
+    def test_client_errors_are_not_retried(self):
+        self.session.responses = [FakeResponse(None, 404, 'Not Found')]
+        self.assertRaises(
+            common.AusPostHttpException, self.api.query_tracking, ['1234'])
+        self.assertEquals(self.backoffs, [])
+
+    def test_trial_request_failing_unexpectedly_is_released(self):
+        for i in range(3):
+            self.circuit_breaker.record_failure()
+        self.circuit_breaker._time = lambda: time.time() + 60
+
+        # the fake session raises IndexError without responses
+        self.assertRaises(IndexError, self.api.query_tracking, ['1234'])
+        self.assertEquals(
+            self.circuit_breaker.state, CircuitBreaker.HALF_OPEN)
+
+        self.session.responses = [FakeResponse(self.tracking_article)]
+        self.api.query_tracking(['1234'])
+        self.assertEquals(self.circuit_breaker.state, CircuitBreaker.CLOSED)
+
+
+class TestSingleFlightRequests(AuspostTestCase):
+    fixtures = ['valid_address']
+
+    def test_concurrent_identical_calls_share_request(self):
+        api = DeliveryChoiceApi(single_flight=True)
+        session = FakeSession([FakeResponse(self.valid_address)])
+        api._session, api._session_pid = session, os.getpid()
+
+        release = threading.Event()
+        get = session.get
+
+        def blocking_get(*args, **kwargs):
+            release.wait(5)
+            return get(*args, **kwargs)
+        session.get = blocking_get
+
+        results = []
+
+        def validate(*args, **kwargs):
+            results.append(api.validate_address(*args, **kwargs))
+
+        threads = [
+            threading.Thread(target=validate, args=(
+                '109/175 Sturt St', 'Southbank', 'VIC', 3006)),
+            threading.Thread(target=validate, kwargs=dict(
+                line1='109/175 Sturt St', suburb='Southbank', state='VIC',
+                postcode='3006'))]
+        for thread in threads:
+            thread.start()
+        while api.single_flight.shared < 1:
+            release.wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEquals(len(session.requests), 1)
+        self.assertEquals([r.is_valid for r in results], [True, True])
+
+    def test_call_keys_are_normalized(self):
+        def query_tracking(self, tracking_numbers, lazy=False, **kwargs):
+            pass
+
+        self.assertEquals(
+            get_call_key(query_tracking, None, [1, '2'], api_name='Q'),
+            get_call_key(query_tracking, None, api_name='Q',
+                         tracking_numbers=('1', 2), lazy=False))
+
+    def test_byte_string_arguments_are_supported(self):
+        api = DeliveryChoiceApi(single_flight=True)
+        session = FakeSession([FakeResponse(self.valid_address)])
+        api._session, api._session_pid = session, os.getpid()
+
+        result = api.validate_address(
+            '1 Caf\xc3\xa9 St', 'Southbank', 'VIC', 3006)
+        self.assertTrue(result.is_valid)
+
+
+class TestBulkAddressValidation(AuspostTestCase):
+    fixtures = ['valid_address']
+
+    def test_duplicate_addresses_are_validated_once(self):
+        api = DeliveryChoiceApi()
+        session = AddressSession(self.valid_address)
+        api.create_session = lambda: session
+
+        addresses = [
+            {'line1': '109/175 Sturt St', 'suburb': 'Southbank',
+             'state': 'VIC', 'postcode': 3006},
+            ('109/175 STURT ST ', 'SOUTHBANK', 'Victoria', '3006'),
+            ('1 Fake St', 'Nowhere', 'XX', '3000'),
+            ('1 fake st', 'nowhere', 'xx', 3000),
+        ] * 10
+
+        results = list(api.iter_validate_addresses(addresses, max_workers=4))
+        self.assertEquals([r[0] for r in results], addresses)
+        self.assertEquals(len(session.requests), 2)
+
+        for address, result, exc in results:
+            if 'Nowhere' in address or 'nowhere' in address:
+                self.assertEquals(result, None)
+                self.assertEquals(exc.code, 1503)
+            else:
+                self.assertEquals(exc, None)
+                self.assertTrue(result.is_valid)
+
+        self.assertEquals(
+            session.requests[0][1]['addressLine1'], '109/175 STURT ST')
+
+
+class TestResponseDecoding(AuspostTestCase):
+    fixtures = ['tracking_article']
+
+    def setUp(self):
+        super(TestResponseDecoding, self).setUp()
+        self.decoded = []
+
+        def json_decoder(content):
+            self.decoded.append(content)
+            return json.loads(content)
+
+        self.api = DeliveryChoiceApi(json_decoder=json_decoder)
+
+    def test_response_is_decoded_once_with_custom_decoder(self):
+        self.api._session = FakeSession([FakeResponse(self.tracking_article)])
+        self.api._session_pid = os.getpid()
+
+        tracking_results = self.api.query_tracking(['1234'])
+        self.assertEquals(tracking_results[0].id, '1234')
+        self.assertEquals(len(self.decoded), 1)
+
+    def test_business_exception_is_raised_from_decoded_json(self):
+        try:
+            self.api.check_json({'QueryTrackEventsResponse': {
+                'BusinessException': {
+                    'Code': 1404, 'Description': 'Not trackable'}}})
+        except common.AusPostException as exc:
+            self.assertEquals(exc.code, 1404)
+            self.assertEquals(exc.message, 'Not trackable')
+        else:
+            self.fail("no exception raised for business exception")
+
+    def test_invalid_json_raises_http_exception(self):
+        response = FakeResponse(None)
+        response.content = '<html>Service Unavailable</html>'
+        self.assertRaises(
+            common.AusPostHttpException, self.api.decode_response, response)
+
+
+class TestPostcodeCapabilityApi(AuspostTestCase):
+    fixtures = ['postcode_delivery_capabilities']
+
+    def setUp(self):
+        super(TestPostcodeCapabilityApi, self).setUp()
+        self.api = DeliveryChoiceApi()
+        self.session = FakeSession([
+            FakeResponse(self.postcode_delivery_capabilities)])
+        self.api._session = self.session
+        self.api._session_pid = os.getpid()
+
+    def test_requesting_all_postcodes(self):
+        capabilities = self.api.postcode_capability()
+        self.assertEquals(capabilities[0].postcode, 3121)
+
+        url, params = self.session.requests[0]
+        self.assertTrue(url.endswith('/PostcodeCapability.json'))
+        self.assertEquals(params, {})
+
+    def test_requesting_single_postcode(self):
+        self.api.postcode_capability(3121)
+        self.assertEquals(self.session.requests[0][1], {'postcode': 3121})
+
+    def test_streaming_all_postcodes(self):
+        capabilities = self.api.postcode_capability(stream=True)
+        self.assertEquals(self.session.requests, [])
+
+        capabilities = list(capabilities)
+        self.assertEquals(len(capabilities), 1)
+        self.assertEquals(capabilities[0].postcode, 3121)
+        self.assertEquals(len(capabilities[0].days), 7)
+
+    def test_streaming_raises_business_exception(self):
+        self.session.responses = [FakeResponse({
+            'PostcodeDeliveryCapabilities': {'BusinessException': {
+                'Code': 1202, 'Description': 'No capability found'}}})]
+        capabilities = self.api.postcode_capability(stream=True)
+        self.assertRaises(common.AusPostException, list, capabilities)
+
+    def test_invalid_postcode_raises_exception(self):
+        try:
+            self.api.postcode_capability('abc')
+        except common.AusPostException as exc:
+            self.assertEquals(exc.code, 1201)
+        else:
+            self.fail("no exception raised for invalid 'postcode'")
+
+
+class TestCustomerCollectionPoints(AuspostTestCase):
+    fixtures = ['customer_collection_points']
+
+    def test_creating_collection_points_from_json_response(self):
+        points = CustomerCollectionPoint.from_json(
+            self.customer_collection_points)
+        self.assertEquals(len(points), 4)
+
+        point = points[0]
+        self.assertEquals(point.id, '99999992')
+        self.assertEquals(point.name, 'Glen Waverley UPL')
+        self.assertEquals(point.active, True)
+        self.assertEquals(point.latitude, 0.0)
+        self.assertEquals(point.bordering_postcodes, [3148, 3149])
+        self.assertEquals(point.number_of_lockers, 3)
+        self.assertEquals(point.address.postcode, 3150)
+        self.assertEquals(
+            point.address.addressLine1,
+            '20, Dunscombe Avenue, Glen Waverley')
+
+    def test_unchanged_collection_points_return_empty_list(self):
+        points = CustomerCollectionPoint.from_json(
+            {'CustomerCollectionPoints': ''})
+        self.assertEquals(points, [])
+
+    def test_requesting_changed_collection_points(self):
+        api = DeliveryChoiceApi()
+        session = FakeSession([FakeResponse(self.customer_collection_points)])
+        api._session, api._session_pid = session, os.getpid()
+
+        api.customer_collection_points(
+            state='VIC', last_update=date(2013, 1, 31))
+        self.assertEquals(
+            session.requests[0][1],
+            {'state': 'VIC', 'lastUpdate': '2013-01-31'})
+
+    def test_streaming_collection_points(self):
+        api = DeliveryChoiceApi()
+        session = FakeSession([FakeResponse(self.customer_collection_points)])
+        api._session, api._session_pid = session, os.getpid()
+
+        points = api.customer_collection_points(state='VIC', stream=True)
+        self.assertEquals(
+            [p.id for p in points],
+            ['99999992', '78888887', '99999993', '99999994'])
+
+    def test_invalid_arguments_raise_exceptions(self):
+        api = DeliveryChoiceApi()
+        for kwargs, code in [({'state': 'XYZ'}, 1301),
+                             ({'postcode': 'abc'}, 1302),
+                             ({'last_update': '2013-01-31'}, 1303)]:
+            try:
+                api.customer_collection_points(**kwargs)
+            except common.AusPostException as exc:
+                self.assertEquals(exc.code, code)
+            else:
+                self.fail("no exception raised for %s" % kwargs)
+
+
+class TestDeliveryDatesCache(AuspostTestCase):
+    fixtures = ['delivery_dates']
+
+    def setUp(self):
+        super(TestDeliveryDatesCache, self).setUp()
+        self.cache = LocMemCache()
+        self.api = DeliveryChoiceApi(cache=self.cache)
+        self.session = FakeSession([
+            FakeResponse(self.delivery_dates),
+            FakeResponse(self.delivery_dates)])
+        self.api._session = self.session
+        self.api._session_pid = os.getpid()
+
+    def test_repeated_lookups_are_served_from_cache(self):
+        dates = self.api.delivery_dates(3000, 2000, date.today())
+        cached_dates = self.api.delivery_dates('3000', 2000, date.today())
+
+        self.assertEquals(len(self.session.requests), 1)
+        self.assertEquals(
+            [d.delivery_date for d in dates],
+            [d.delivery_date for d in cached_dates])
+        self.assertEquals(self.cache.stats()['hits'], 1)
+
+    def test_different_arguments_are_cached_separately(self):
+        self.api.delivery_dates(3000, 2000, date.today())
+        self.api.delivery_dates(3000, 2000, date.today(), network_id='02')
+        self.assertEquals(len(self.session.requests), 2)
+
+    def test_cache_is_disabled_by_default(self):
+        self.assertEquals(DeliveryChoiceApi().cache, None)
+
+
+class TestApiMetrics(AuspostTestCase):
+    fixtures = ['delivery_dates', 'postcode_delivery_capabilities']
+
+    def setUp(self):
+        super(TestApiMetrics, self).setUp()
+        self.metrics = Metrics()
+        self.api = DeliveryChoiceApi(cache=LocMemCache(), metrics=self.metrics)
+        self.session = FakeSession([
+            FakeResponse(self.delivery_dates),
+            FakeResponse(self.postcode_delivery_capabilities)])
+        self.api._session, self.api._session_pid = self.session, os.getpid()
+
+    def test_calls_phases_and_cache_hits_are_recorded(self):
+        self.api.delivery_dates(3000, 2000, date.today())
+        self.api.delivery_dates(3000, 2000, date.today())
+
+        api = 'DeliveryDates'
+        self.assertEquals(
+            self.metrics.get_counter('requests_total', api=api), 2)
+        self.assertEquals(
+            self.metrics.get_counter('response_bytes_total', api=api),
+            len(json.dumps(self.delivery_dates)))
+        self.assertEquals(self.metrics.get_cache_hit_rate(api), 0.5)
+        for phase in ('network', 'decode', 'model'):
+            histogram = self.metrics.get_histogram(
+                'latency_seconds', api=api, phase=phase)
+            self.assertEquals(histogram.count, 1)
+
+    def test_errors_are_counted_by_code(self):
+        self.assertRaises(
+            common.AusPostException,
+            self.api.delivery_dates, 'abc', 2000, date.today())
+        self.assertEquals(self.metrics.get_counter(
+            'errors_total', api='DeliveryDates', code=1001), 1)
+
+    def test_streamed_responses_are_recorded(self):
+        self.session.responses.pop(0)
+        list(self.api.postcode_capability(stream=True))
+
+        api = 'PostcodeCapability'
+        self.assertEquals(
+            self.metrics.get_counter('response_bytes_total', api=api),
+            len(json.dumps(self.postcode_delivery_capabilities)))
+        histogram = self.metrics.get_histogram(
+            'latency_seconds', api=api, phase='model')
+        self.assertEquals(histogram.count, 1)
+
+
+class TestBulkTracking(TestCase):
+
+    def setUp(self):
+        self.api = DeliveryChoiceApi()
+        self.session = TrackingSession()
+        self.api.create_session = lambda: self.session
+
+    def test_query_tracking_rejects_more_than_ten_ids(self):
+        try:
+            self.api.query_tracking([str(i) for i in range(11)])
+        except common.AusPostException as exc:
+            self.assertEquals(exc.code, 1402)
+        else:
+            self.fail("no exception raised for too many tracking IDs")
+
+    def test_bulk_tracking_merges_results_in_input_order(self):
+        tracking_ids = ['ID%03d' % i for i in range(35)]
+        results, errors = self.api.bulk_query_tracking(
+            tracking_ids, max_workers=3)
+
+        self.assertEquals(errors, [])
+        self.assertEquals([r.id for r in results], tracking_ids)
+        self.assertEquals(
+            sorted(len(p['q'].split(',')) for u, p in self.session.requests),
+            [5, 10, 10, 10])
+
+    def test_bulk_tracking_collects_errors_per_chunk(self):
+        tracking_ids = ['ID%03d' % i for i in range(25)]
+        tracking_ids[12] = 'BAD'
+        results, errors = self.api.bulk_query_tracking(tracking_ids)
+
+        self.assertEquals(len(results), 15)
+        self.assertEquals(len(errors), 1)
+
+        chunk, exc = errors[0]
+        self.assertEquals(chunk, tracking_ids[10:20])
+        self.assertEquals(exc.code, 1401)
+
+
+class DeliveryDatesSession(FakeSession):
+    """ Fake session that returns the same delivery dates for any lane. """
+
+    def __init__(self, delivery_dates):
+        super(DeliveryDatesSession, self).__init__()
+        self.delivery_dates = delivery_dates
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, **kwargs):
+        with self.lock:
+            self.requests.append((url, params))
+        return FakeResponse(self.delivery_dates)
+
+
+class TestBulkDeliveryDates(AuspostTestCase):
+    fixtures = ['delivery_dates']
+
+    def setUp(self):
+        super(TestBulkDeliveryDates, self).setUp()
+        self.api = DeliveryChoiceApi()
+        self.session = DeliveryDatesSession(self.delivery_dates)
+        self.api.create_session = lambda: self.session
+
+    def test_lanes_are_deduplicated_and_validated(self):
+        lanes = [(3000, 2000), ('3000', '2000', '01'), (3000, 2000, '02'),
+                 (3000, 'abc'), (4000, 2000, '99')]
+        dates, errors = self.api.bulk_delivery_dates(
+            lanes, date.today(), max_workers=2)
+
+        self.assertEquals(
+            sorted(dates), [('3000', '2000', '01'), ('3000', '2000', '02')])
+        self.assertEquals(len(dates[common.normalize_lane(3000, 2000)]), 3)
+        self.assertEquals(
+            len(dates[common.normalize_lane('3000', '2000', '01')]), 3)
+        self.assertEquals(
+            [(lane, exc.code) for lane, exc in errors],
+            [(('3000', 'abc', '01'), 1002), (('4000', '2000', '99'), 1003)])
+        self.assertEquals(len(self.session.requests), 2)
+
+    def test_invalid_lodgement_is_rejected_up_front(self):
+        for kwargs, code in [
+                ({'lodgement_date': date.today() - timedelta(days=1)}, 1004),
+                ({'lodgement_date': date.today(), 'number_of_dates': 11},
+                 1005)]:
+            try:
+                self.api.bulk_delivery_dates([(3000, 2000)], **kwargs)
+            except common.AusPostException as exc:
+                self.assertEquals(exc.code, code)
+            else:
+                self.fail("no exception raised for %s" % kwargs)
+        self.assertEquals(self.session.requests, [])
+
+
 class TestDeliveryChoiceApi(TestCase):
 
     def setUp(self):
@@ -55,6 +675,24 @@ class TestDeliveryChoiceApi(TestCase):
         else:
             self.fail("no exception raised for invalid 'lodgement_date'")
 
+    def test_postcode_table_rejects_unknown_postcodes(self):
+        api = DeliveryChoiceApi(postcode_table=True)
+        try:
+            api.delivery_dates(3000, 10000, date.today())
+        except common.AusPostException as exc:
+            self.assertEquals(exc.code, 1002)
+        else:
+            self.fail("no exception raised for unknown 'to_postcode'")
+
+    def test_postcode_table_rejects_invalid_address(self):
+        api = DeliveryChoiceApi(postcode_table=True)
+        try:
+            api.validate_address('483 George St', 'Sydney', 'VIC', 2000)
+        except common.AusPostException as exc:
+            self.assertEquals(exc.code, 1503)
+        else:
+            self.fail("no exception raised for invalid 'state'")
+
     def test_using_delivery_dates_with_invalid_number_of_dates(self):
         try:
             self.api.delivery_dates(
@@ -197,6 +835,67 @@ class TestTracking(AuspostTestCase):
         self.assertEquals(len(tr.article.events), 3)
 
 
+class TestModel(AuspostTestCase):
+    fixtures = ['tracking_article']
+
+    def test_models_do_not_have_instance_dict(self):
+        tr = TrackingResult.from_json(self.tracking_article)[0]
+        for obj in [tr, tr.article, tr.article.events[0]]:
+            self.assertFalse(hasattr(obj, '__dict__'))
+
+    def test_models_can_be_pickled(self):
+        tr = TrackingResult.from_json(self.tracking_article)[0]
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            restored = pickle.loads(pickle.dumps(tr, protocol))
+            self.assertEquals(restored.id, tr.id)
+            self.assertEquals(restored.consignment, None)
+            self.assertEquals(
+                [e.timestamp for e in restored.article.events],
+                [e.timestamp for e in tr.article.events])
+
+    def test_field_names_are_public_attributes(self):
+        self.assertEquals(Article.get_field_names(), (
+            'id', 'product_name', 'event_notification', 'status', 'origin',
+            'destination', 'events'))
+        self.assertEquals(
+            Event.get_field_names(), Event.get_slot_names())
+
+
+class TestLazyEvents(AuspostTestCase):
+    fixtures = ['tracking_multiple_articles']
+
+    def test_events_are_parsed_on_first_access(self):
+        tracking_results = TrackingResult.from_json(
+            self.tracking_multiple_articles, lazy=True)
+        article = tracking_results[1].article
+
+        self.assertEquals(article._events, [])
+        self.assertEquals(article.status, 'Delivered')
+        self.assertEquals(len(article.events), 3)
+        self.assertEquals(article._events_json, None)
+        self.assertTrue(article.events is article.events)
+
+    def test_latest_event_does_not_parse_all_events(self):
+        tracking_results = TrackingResult.from_json(
+            self.tracking_multiple_articles, lazy=True)
+        article = tracking_results[1].article
+
+        latest_event = article.latest_event
+        self.assertEquals(
+            latest_event.timestamp,
+            pytz.utc.localize(datetime(2010, 6, 21, 2, 21, 12)))
+        self.assertEquals(article._events, [])
+
+        self.assertEquals(tracking_results[0].article.latest_event, None)
+
+    def test_latest_event_of_eagerly_parsed_article(self):
+        tracking_results = TrackingResult.from_json(
+            self.tracking_multiple_articles)
+        self.assertEquals(
+            tracking_results[1].article.latest_event,
+            tracking_results[1].article.events[0])
+
+
 class TestEvent(AuspostTestCase):
     fixtures = ['events']
 
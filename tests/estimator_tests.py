@@ -0,0 +1,146 @@
+import os
+import pytz
+
+from StringIO import StringIO
+from datetime import date, datetime, timedelta
+from unittest import TestCase
+
+from auspost import common
+from auspost.delivery_choice import DeliveryChoiceApi, DeliveryDate
+from auspost.estimator import (WorkingDayCalendar, DeliveryDateEstimator,
+                               EstimatedDeliveryDate, get_easter_sunday,
+                               get_national_holidays)
+
+from tests.delivery_choice_tests import FakeSession, FakeResponse
+
+
+def create_dates(working_days, timed=(False,)):
+    return [DeliveryDate(None, working_days + i, t)
+            for i, t in enumerate(timed)]
+
+
+def next_monday():
+    today = date.today()
+    return today + timedelta(days=7 - today.weekday())
+
+
+class TestWorkingDayCalendar(TestCase):
+
+    def test_national_holidays(self):
+        self.assertEquals(get_easter_sunday(2013), date(2013, 3, 31))
+        self.assertEquals(get_easter_sunday(2014), date(2014, 4, 20))
+
+        holidays = get_national_holidays(2011)
+        # Christmas on a Sunday and Boxing Day are moved to Mon and Tue
+        self.assertTrue(date(2011, 12, 26) in holidays)
+        self.assertTrue(date(2011, 12, 27) in holidays)
+        self.assertTrue(date(2011, 4, 22) in holidays)
+        self.assertTrue(date(2011, 4, 25) in holidays)
+
+    def test_adding_working_days_skips_weekends_and_holidays(self):
+        calendar = WorkingDayCalendar(holidays=[date(2013, 3, 5)])
+        # Thursday before Easter
+        self.assertEquals(
+            calendar.add_working_days(date(2013, 3, 28), 1),
+            date(2013, 4, 2))
+        self.assertEquals(
+            calendar.add_working_days(date(2013, 3, 1), 2),
+            date(2013, 3, 6))
+
+
+class TestDeliveryDateEstimator(TestCase):
+
+    def setUp(self):
+        self.estimator = DeliveryDateEstimator(
+            calendar=WorkingDayCalendar(national_holidays=False))
+
+    def test_estimate_uses_most_common_working_days(self):
+        for working_days in (2, 2, 2, 3):
+            self.estimator.learn(
+                3000, 2000, '01', create_dates(working_days, (False, True)))
+
+        dates = self.estimator.estimate(
+            '3000', '2000', date(2013, 3, 1), number_of_dates=2)
+        self.assertEquals(
+            [(d.delivery_date, d.working_days, d.timed_delivery)
+             for d in dates],
+            [(pytz.utc.localize(datetime(2013, 3, 5)), 2, False),
+             (pytz.utc.localize(datetime(2013, 3, 6)), 3, True)])
+        self.assertAlmostEqual(dates[0].confidence, 3 / 6.0)
+
+    def test_unknown_lanes_fall_back_to_region_and_state(self):
+        for i in range(8):
+            self.estimator.learn(3000, 2000, '01', create_dates(2))
+
+        self.assertAlmostEqual(self.estimator.estimate(
+            3000, 2010, date(2013, 3, 1))[0].confidence, 0.8 * 0.7)
+        self.assertAlmostEqual(self.estimator.estimate(
+            3100, 2500, date(2013, 3, 1))[0].confidence, 0.8 * 0.4)
+        self.assertEquals(
+            self.estimator.estimate(3000, 4000, date(2013, 3, 1)), [])
+        self.assertEquals(self.estimator.estimate(
+            3000, 2010, date(2013, 3, 1), min_confidence=0.8), [])
+
+    def test_lanes_can_be_saved_and_loaded(self):
+        self.estimator.learn(3000, 2000, '01', create_dates(2))
+        output = StringIO()
+        self.estimator.dump(output)
+
+        estimator = DeliveryDateEstimator()
+        estimator.load(StringIO(output.getvalue()))
+        self.assertEquals(len(estimator), 3)
+        self.assertEquals(
+            estimator.estimate(3000, 2000, date(2013, 3, 1))[0].working_days,
+            2)
+
+
+class TestDeliveryDatesFallback(TestCase):
+
+    def setUp(self):
+        self.estimator = DeliveryDateEstimator(min_confidence=0.5)
+        self.api = DeliveryChoiceApi(estimator=self.estimator)
+        self.session = FakeSession()
+        self.api._session, self.api._session_pid = self.session, os.getpid()
+        self.lodgement_date = next_monday()
+
+    def add_response(self, working_days):
+        delivery_date = self.lodgement_date + timedelta(days=working_days)
+        self.session.responses.append(FakeResponse({
+            'DeliveryEstimateRequestResponse': {'DeliveryEstimateDates': {
+                'DeliveryEstimateDate': {
+                    'DeliveryDate': delivery_date.strftime('%Y-%m-%d'),
+                    'NumberOfWorkingDays': working_days,
+                    'TimedDeliveryEnabled': False}}}}))
+
+    def test_estimate_is_returned_when_api_fails(self):
+        self.add_response(2)
+        self.session.responses.append(FakeResponse({}, 503, 'Unavailable'))
+
+        dates = self.api.delivery_dates(3000, 2000, self.lodgement_date)
+        self.assertFalse(isinstance(dates[0], EstimatedDeliveryDate))
+
+        dates = self.api.delivery_dates(3000, 2000, self.lodgement_date)
+        self.assertTrue(isinstance(dates[0], EstimatedDeliveryDate))
+        self.assertEquals(dates[0].working_days, 2)
+
+    def test_errors_are_raised_without_estimate(self):
+        self.session.responses.append(FakeResponse({}, 503, 'Unavailable'))
+        self.assertRaises(
+            common.AusPostHttpException,
+            self.api.delivery_dates, 3000, 2000, self.lodgement_date)
+
+    def test_confident_estimate_is_used_first(self):
+        for i in range(3):
+            self.add_response(2)
+            self.api.delivery_dates(3000, 2000, self.lodgement_date)
+
+        dates = self.api.delivery_dates(
+            3000, 2000, self.lodgement_date, estimate=True)
+        self.assertTrue(isinstance(dates[0], EstimatedDeliveryDate))
+        self.assertEquals(len(self.session.requests), 3)
+
+        # not confident enough for a different region
+        self.add_response(3)
+        dates = self.api.delivery_dates(
+            3000, 4000, self.lodgement_date, estimate=True)
+        self.assertFalse(isinstance(dates[0], EstimatedDeliveryDate))
@@ -0,0 +1,78 @@
+import random
+
+from unittest import TestCase
+
+from auspost.geo import CollectionPointLocator, haversine
+from auspost.delivery_choice import (Address, Country,
+                                     CustomerCollectionPoint)
+
+
+def create_point(id, postcode, latitude=None, longitude=None, active=True,
+                 bordering_postcodes=None):
+    address = Address(id, 'Line 1', 'Suburb', 'VIC', postcode,
+                      Country('AU', 'Australia'))
+    return CustomerCollectionPoint(
+        id, 'Point %s' % id, active, address, latitude, longitude,
+        bordering_postcodes=bordering_postcodes)
+
+
+class TestHaversine(TestCase):
+
+    def test_distance_between_melbourne_and_sydney(self):
+        distance = haversine(-37.8136, 144.9631, -33.8688, 151.2093)
+        self.assertTrue(710 < distance < 720)
+
+
+class TestCollectionPointLocator(TestCase):
+
+    def test_nearest_points_match_brute_force_search(self):
+        rand = random.Random(42)
+        points = [
+            create_point(i, 3000, rand.uniform(-39, -34),
+                         rand.uniform(141, 150), active=bool(i % 5))
+            for i in range(2000)]
+        locator = CollectionPointLocator(points, cell_size=0.2)
+
+        for _ in range(20):
+            lat, lon = rand.uniform(-40, -33), rand.uniform(140, 151)
+            expected = sorted(
+                (p for p in points if p.active),
+                key=lambda p: haversine(lat, lon, p.latitude, p.longitude))
+            self.assertEquals(
+                [p.id for p in locator.nearest(lat, lon, n=5)],
+                [p.id for p in expected[:5]])
+
+    def test_max_distance_limits_results(self):
+        locator = CollectionPointLocator([
+            create_point(1, 3000, -37.81, 144.96),
+            create_point(2, 2000, -33.87, 151.21)])
+        nearest = locator.nearest(-37.8, 144.9, n=5, max_distance=100)
+        self.assertEquals([p.id for p in nearest], ['1'])
+
+    def test_no_points_are_returned_for_zero_results(self):
+        locator = CollectionPointLocator([
+            create_point(1, 3000, -37.81, 144.96)])
+        self.assertEquals(locator.nearest(-37.8, 144.9, n=0), [])
+
+    def test_points_without_location_are_found_by_bordering_postcode(self):
+        locator = CollectionPointLocator([
+            create_point(1, 3150, 0.0, 0.0, bordering_postcodes=[3148]),
+            create_point(2, 3148, bordering_postcodes=[3147]),
+            create_point(3, 3147),
+            create_point(4, 3147, active=False)])
+
+        self.assertEquals(locator.nearest(0.0, 0.0), [])
+        self.assertEquals(locator.bordering_postcodes(3148),
+                          set([3147, 3150]))
+        self.assertEquals(
+            [p.id for p in locator.nearest_to_postcode(3150, n=3)],
+            ['1', '2', '3'])
+
+    def test_postcode_lookup_uses_location_of_points(self):
+        locator = CollectionPointLocator([
+            create_point(1, 3150, -37.88, 145.16, bordering_postcodes=[3149]),
+            create_point(2, 3149, -37.86, 145.13),
+            create_point(3, 2000, -33.87, 151.21)])
+        self.assertEquals(
+            [p.id for p in locator.nearest_to_postcode(3150, n=2)],
+            ['1', '2'])
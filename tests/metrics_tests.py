@@ -0,0 +1,81 @@
+from unittest import TestCase
+
+from auspost import common
+from auspost.metrics import Metrics, Histogram, get_error_code
+
+
+class TestHistogram(TestCase):
+
+    def test_values_are_counted_in_cumulative_buckets(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+
+        self.assertEquals(
+            histogram.get_cumulative_counts(),
+            [(0.1, 2), (1.0, 3), (float('inf'), 4)])
+        self.assertEquals(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 3.65)
+
+
+class TestMetrics(TestCase):
+
+    def setUp(self):
+        self.recorded = []
+        self.metrics = Metrics(
+            buckets=(0.1, 1.0),
+            callback=lambda *args: self.recorded.append(args))
+
+    def test_counters_are_kept_per_api_and_code(self):
+        self.metrics.record_call('DeliveryDates')
+        self.metrics.record_call('DeliveryDates')
+        self.metrics.record_error(
+            'DeliveryDates', common.AusPostException(1001))
+        self.metrics.record_error('QueryTracking', ValueError())
+
+        self.assertEquals(
+            self.metrics.get_counter('requests_total', api='DeliveryDates'),
+            2)
+        self.assertEquals(self.metrics.get_counter(
+            'errors_total', api='DeliveryDates', code=1001), 1)
+        self.assertEquals(self.metrics.get_counter(
+            'errors_total', api='QueryTracking', code='ValueError'), 1)
+        self.assertEquals(
+            self.metrics.get_api_names(), ['DeliveryDates', 'QueryTracking'])
+
+    def test_cache_hit_rate(self):
+        self.assertEquals(self.metrics.get_cache_hit_rate('A'), 0.0)
+        for hit in (True, True, False):
+            self.metrics.record_cache('A', hit)
+        self.assertAlmostEqual(self.metrics.get_cache_hit_rate('A'), 2 / 3.0)
+
+    def test_callback_receives_every_value(self):
+        self.metrics.record_latency('A', 'network', 0.2)
+        self.metrics.record_response_bytes('A', 512)
+        self.assertEquals(self.recorded, [
+            ('latency_seconds', {'api': 'A', 'phase': 'network'}, 0.2),
+            ('response_bytes_total', {'api': 'A'}, 512)])
+
+    def test_prometheus_export(self):
+        self.metrics.record_call('DeliveryDates')
+        self.metrics.record_latency('DeliveryDates', 'decode', 0.5)
+
+        self.assertEquals(self.metrics.to_prometheus().splitlines(), [
+            '# TYPE auspost_requests_total counter',
+            'auspost_requests_total{api="DeliveryDates"} 1',
+            '# TYPE auspost_latency_seconds histogram',
+            'auspost_latency_seconds_bucket'
+            '{api="DeliveryDates",phase="decode",le="0.1"} 0',
+            'auspost_latency_seconds_bucket'
+            '{api="DeliveryDates",phase="decode",le="1.0"} 1',
+            'auspost_latency_seconds_bucket'
+            '{api="DeliveryDates",phase="decode",le="+Inf"} 1',
+            'auspost_latency_seconds_sum'
+            '{api="DeliveryDates",phase="decode"} 0.5',
+            'auspost_latency_seconds_count'
+            '{api="DeliveryDates",phase="decode"} 1'])
+
+    def test_error_code_falls_back_to_exception_name(self):
+        self.assertEquals(
+            get_error_code(common.AusPostHttpException(503)), 503)
+        self.assertEquals(get_error_code(KeyError()), 'KeyError')
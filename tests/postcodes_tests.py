@@ -0,0 +1,52 @@
+from StringIO import StringIO
+from unittest import TestCase
+
+from auspost import common
+from auspost.postcodes import PostcodeTable
+
+
+SUBURBS_CSV = """postcode,suburb,state
+3006,SOUTHBANK,VIC
+3006,SOUTH WHARF,VIC
+2000,SYDNEY,NSW
+"""
+
+
+class TestPostcodeTable(TestCase):
+
+    def setUp(self):
+        self.table = PostcodeTable()
+
+    def assertRaisesCode(self, code, func, *args, **kwargs):
+        try:
+            func(*args, **kwargs)
+        except common.AusPostException as exc:
+            self.assertEquals(exc.code, code)
+        else:
+            self.fail("no exception raised with code %d" % code)
+
+    def test_postcodes_are_mapped_to_states(self):
+        self.assertEquals(self.table.get_states(3006), set(['VIC']))
+        self.assertEquals(self.table.get_states('0800'), set(['NT']))
+        self.assertEquals(self.table.get_states(2620), set(['ACT', 'NSW']))
+        self.assertEquals(self.table.get_states(10000), set())
+        self.assertTrue(self.table.is_valid_state('3006', 'Victoria'))
+        self.assertFalse(self.table.is_valid_state(2000, 'VIC'))
+
+    def test_checking_addresses(self):
+        self.table.check_address('Southbank', 'VIC', 3006)
+        self.table.check_address('Anywhere', 'XX', 'abc', country='NZ')
+
+        self.assertRaisesCode(
+            1504, self.table.check_address, 'Southbank', 'VIC', 'abc')
+        self.assertRaisesCode(
+            1503, self.table.check_address, 'Sydney', 'VIC', 2000)
+
+    def test_suburbs_are_checked_once_loaded(self):
+        self.table.check_address('Melbourne', 'VIC', 3006)
+
+        self.assertEquals(self.table.load_suburbs(StringIO(SUBURBS_CSV)), 2)
+        self.table.check_address('south  wharf', 'VIC', 3006)
+        self.table.check_address('Carlton', 'VIC', 3053)
+        self.assertRaisesCode(
+            1502, self.table.check_address, 'Melbourne', 'VIC', 3006)
@@ -0,0 +1,95 @@
+import json
+import pytz
+
+from datetime import datetime
+from unittest import TestCase, skipIf
+
+from auspost import serialization
+from auspost.estimator import EstimatedDeliveryDate
+from auspost.delivery_choice import (DeliveryDate, TrackingResult,
+                                     ValidationResult, CustomerCollectionPoint,
+                                     PostcodeDeliveryCapability)
+
+
+def load_fixture(name):
+    with open('tests/data/%s.json' % name) as fixture:
+        return json.load(fixture)
+
+
+class TestModelDict(TestCase):
+
+    def test_models_can_be_restored_from_dict(self):
+        models = (
+            DeliveryDate.from_json(load_fixture('delivery_dates')) +
+            TrackingResult.from_json(load_fixture('tracking_article')) +
+            CustomerCollectionPoint.from_json(
+                load_fixture('customer_collection_points')) +
+            PostcodeDeliveryCapability.from_json(
+                load_fixture('postcode_delivery_capabilities')) +
+            [ValidationResult.from_json(load_fixture('valid_address'))])
+
+        for model in models:
+            data = json.loads(json.dumps(model.to_dict()))
+            restored = model.__class__.from_dict(data)
+            self.assertEquals(restored.__class__, model.__class__)
+            self.assertEquals(restored.to_dict(), model.to_dict())
+
+    def test_timestamps_are_restored_without_parsing(self):
+        result = TrackingResult.from_json(load_fixture('tracking_article'))[0]
+        data = result.to_dict()
+        self.assertEquals(
+            data['article']['_events'][0]['timestamp'],
+            {'_type': 'datetime', 'us': 1315102462000000})
+
+        restored = TrackingResult.from_dict(data)
+        timestamp = restored.article.events[0].timestamp
+        self.assertEquals(
+            timestamp, pytz.utc.localize(datetime(2011, 9, 4, 2, 14, 22)))
+        self.assertEquals(timestamp.tzinfo, pytz.utc)
+
+    def test_lazy_articles_stay_lazy(self):
+        result = TrackingResult.from_json(
+            load_fixture('tracking_multiple_articles'), lazy=True)[1]
+        restored = TrackingResult.from_dict(result.to_dict())
+
+        self.assertEquals(restored.article._events, [])
+        self.assertEquals(len(restored.article.events), 3)
+
+    def test_subclasses_in_other_modules_are_restored(self):
+        estimate = EstimatedDeliveryDate(
+            pytz.utc.localize(datetime(2013, 3, 5)), 2, False, 0.75)
+        restored = DeliveryDate.from_dict(estimate.to_dict())
+        self.assertTrue(isinstance(restored, EstimatedDeliveryDate))
+        self.assertEquals(restored.confidence, 0.75)
+
+    def test_invalid_data_is_rejected(self):
+        data = DeliveryDate.from_json(
+            load_fixture('delivery_dates'))[0].to_dict()
+        self.assertRaises(ValueError, TrackingResult.from_dict, data)
+
+        data['_version'] = 99
+        self.assertRaises(ValueError, DeliveryDate.from_dict, data)
+
+
+class TestSerialization(TestCase):
+
+    def setUp(self):
+        self.results = TrackingResult.from_json(
+            load_fixture('tracking_multiple_articles'))
+
+    def assert_round_trip(self, format):
+        data = serialization.dumps(self.results, format=format)
+        restored = serialization.loads(data)
+        self.assertEquals(
+            [r.to_dict() for r in restored],
+            [r.to_dict() for r in self.results])
+
+    def test_json_format(self):
+        self.assert_round_trip(serialization.JSON)
+
+    @skipIf(serialization.msgpack is None, "msgpack is not installed")
+    def test_msgpack_format(self):
+        self.assert_round_trip(serialization.MSGPACK)
+        self.assertTrue(
+            len(serialization.dumps(self.results, serialization.MSGPACK)) <
+            len(serialization.dumps(self.results, serialization.JSON)))
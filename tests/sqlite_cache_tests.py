@@ -0,0 +1,170 @@
+import os
+import json
+import shutil
+import tempfile
+
+from unittest import TestCase, skipIf
+
+from auspost import serialization
+from auspost.sqlite_cache import SQLiteCache
+from auspost.delivery_choice import DeliveryChoiceApi, TrackingResult
+
+from tests.delivery_choice_tests import AddressSession, TrackingSession
+
+
+class SQLiteCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+class TestSQLiteCache(SQLiteCacheTestCase):
+
+    def setUp(self):
+        super(TestSQLiteCache, self).setUp()
+        self.now = 1000.0
+        self.cache = self.create_cache()
+
+    def create_cache(self, **kwargs):
+        kwargs.setdefault('timeout', 60)
+        cache = SQLiteCache(self.path, **kwargs)
+        cache._time = lambda: self.now
+        return cache
+
+    def test_items_expire_after_timeout(self):
+        self.cache.set(('a', 1), [1, 2])
+        self.cache.set(('b', 2), u'b', timeout=10)
+        self.now += 30
+
+        self.assertEquals(self.cache.get(('a', 1)), [1, 2])
+        self.assertEquals(self.cache.get(('b', 2)), None)
+        self.assertEquals(self.cache.get(('b', 2), 'default'), 'default')
+
+    def test_items_are_stored_as_json(self):
+        cache = self.create_cache(format=serialization.JSON)
+        cache.set('a', [{u'x': 1}, u'caf\xe9'])
+        self.assertEquals(cache.get('a'), [{u'x': 1}, u'caf\xe9'])
+
+    def test_unreadable_items_are_missed(self):
+        self.cache.set('a', 1)
+        self.cache.execute("UPDATE cache SET value = 'garbage'")
+        self.assertEquals(self.cache.get('a', 'default'), 'default')
+        self.assertEquals(self.cache.stats()['misses'], 1)
+
+    @skipIf(serialization.msgpack is None, "msgpack is not installed")
+    def test_msgpack_items_are_missed_without_msgpack(self):
+        self.cache.set('a', 1)
+
+        msgpack, serialization.msgpack = serialization.msgpack, None
+        try:
+            self.assertEquals(self.cache.get('a'), None)
+        finally:
+            serialization.msgpack = msgpack
+
+    def test_items_are_shared_between_instances(self):
+        other = self.create_cache()
+        self.cache.set('a', {u'x': 1})
+
+        self.assertEquals(other.get('a'), {u'x': 1})
+        other.delete('a')
+        self.assertEquals(self.cache.get('a'), None)
+
+    def test_items_are_shared_between_processes(self):
+        # the child inherits the open connection and has to reconnect
+        self.assertEquals(len(self.cache), 0)
+        pid = os.fork()
+        if not pid:
+            status = 1
+            try:
+                self.cache.set('child', os.getpid())
+                status = 0
+            finally:
+                os._exit(status)
+
+        status = os.waitpid(pid, 0)[1]
+        self.assertEquals(status, 0)
+        self.assertEquals(self.cache.get('child'), pid)
+
+    def test_items_expiring_first_are_evicted(self):
+        cache = self.create_cache(max_entries=2, cull_frequency=1)
+        cache.set('a', 1, timeout=30)
+        cache.set('b', 2, timeout=10)
+        cache.set('c', 3)
+
+        self.assertEquals(cache.get('a'), 1)
+        self.assertEquals(cache.get('b'), None)
+        self.assertEquals(cache.get('c'), 3)
+        self.assertEquals(cache.evictions, 1)
+        self.assertEquals(len(cache), 2)
+
+    def test_expired_items_are_removed(self):
+        cache = self.create_cache(cull_frequency=1)
+        cache.set('a', 1, timeout=10)
+        self.now += 20
+        cache.set('b', 2)
+
+        self.assertEquals(len(cache), 1)
+        self.assertEquals(cache.evictions, 1)
+
+    def test_stats_count_hits_and_misses(self):
+        self.cache.set('a', 1)
+        self.cache.get('a')
+        self.cache.get('a')
+        self.cache.get('b')
+
+        stats = self.cache.stats()
+        self.assertEquals(stats['hits'], 2)
+        self.assertEquals(stats['misses'], 1)
+        self.assertEquals(stats['entries'], 1)
+        self.assertAlmostEqual(stats['hit_rate'], 2 / 3.0)
+
+    def test_clear_removes_all_items(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.clear()
+        self.assertEquals(len(self.cache), 0)
+
+
+class TestSharedApiCache(SQLiteCacheTestCase):
+
+    def create_api(self):
+        api = DeliveryChoiceApi(
+            cache=SQLiteCache(self.path),
+            cache_timeouts={'QueryTracking': 60})
+        api._session, api._session_pid = TrackingSession(), os.getpid()
+        return api
+
+    def test_results_are_shared_between_clients(self):
+        api, other = self.create_api(), self.create_api()
+        results = api.query_tracking(['ABC123'])
+        cached_results = other.query_tracking(['ABC123'])
+
+        self.assertEquals(len(other._session.requests), 0)
+        self.assertTrue(isinstance(cached_results[0], TrackingResult))
+        self.assertEquals(cached_results[0].id, results[0].id)
+        self.assertEquals(other.cache.stats()['hits'], 1)
+
+    def test_address_validation_errors_are_cached(self):
+        api = DeliveryChoiceApi()
+        api._session = AddressSession(
+            json.load(open('tests/data/valid_address.json')))
+        api._session_pid = os.getpid()
+        cache = SQLiteCache(self.path)
+
+        addresses = [('1 Fake St', 'Nowhere', 'XX', '3000'),
+                     ('109/175 Sturt St', 'Southbank', 'VIC', '3006')] * 2
+        results = list(api.iter_validate_addresses(
+            addresses, max_workers=1, cache=cache))
+
+        self.assertEquals(len(api._session.requests), 2)
+        self.assertEquals(cache.stats()['hits'], 2)
+        self.assertEquals(
+            [exc.code for address, result, exc in results[::2]],
+            [1503, 1503])
+        self.assertEquals(
+            [result.is_valid for address, result, exc in results[1::2]],
+            [True, True])
@@ -0,0 +1,89 @@
+import copy
+
+from datetime import date
+
+from auspost.stores import PostcodeCapabilityIndex, CollectionPointStore
+from auspost.delivery_choice import (PostcodeDeliveryCapability,
+                                     CustomerCollectionPoint)
+
+from tests.delivery_choice_tests import AuspostTestCase
+
+
+class TestPostcodeCapabilityIndex(AuspostTestCase):
+    fixtures = ['postcode_delivery_capabilities']
+
+    def get_capabilities(self, last_modified=None, timed_delivery=True):
+        json_data = copy.deepcopy(self.postcode_delivery_capabilities)
+        item = json_data['PostcodeDeliveryCapabilities'][
+            'PostcodeDeliveryCapability']
+        if last_modified:
+            item['LastModified'] = last_modified
+        for day in item['WeekDay']:
+            if day['TimedDeliveryEnabled']:
+                day['TimedDeliveryEnabled'] = timed_delivery
+        return PostcodeDeliveryCapability.from_json(json_data)
+
+    def test_looking_up_capabilities_by_day(self):
+        index = PostcodeCapabilityIndex(self.get_capabilities())
+
+        self.assertTrue(3121 in index)
+        self.assertTrue('3121' in index)
+        self.assertFalse(3000 in index)
+
+        # 2013-01-07 is a Monday
+        self.assertTrue(index.standard_delivery(3121, date(2013, 1, 7)))
+        self.assertTrue(index.timed_delivery('3121', 5))
+        self.assertFalse(index.standard_delivery(3121, 6))
+        self.assertFalse(index.timed_delivery(3121, date(2013, 1, 13)))
+        self.assertRaises(KeyError, index.timed_delivery, 3000, 1)
+
+    def test_only_newer_capabilities_are_updated(self):
+        index = PostcodeCapabilityIndex(self.get_capabilities())
+
+        updated = index.update(self.get_capabilities(timed_delivery=False))
+        self.assertEquals(updated, 0)
+        self.assertTrue(index.timed_delivery(3121, 1))
+
+        updated = index.update(self.get_capabilities(
+            last_modified="2012-01-01T10:00:00.000+10:00",
+            timed_delivery=False))
+        self.assertEquals(updated, 1)
+        self.assertFalse(index.timed_delivery(3121, 1))
+        self.assertEquals(index.last_modified.year, 2012)
+
+
+class FakeCollectionPointApi(object):
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def customer_collection_points(self, **kwargs):
+        self.calls.append(kwargs)
+        return self.responses.pop(0)
+
+
+class TestCollectionPointStore(AuspostTestCase):
+    fixtures = ['customer_collection_points']
+
+    def test_syncing_only_requests_changes_since_last_sync(self):
+        points = CustomerCollectionPoint.from_json(
+            self.customer_collection_points)
+        changed = CustomerCollectionPoint.from_json(
+            self.customer_collection_points)[:1]
+        changed[0].active = False
+
+        api = FakeCollectionPointApi([points, changed])
+        store = CollectionPointStore(state='VIC')
+
+        self.assertEquals(store.sync(api, today=date(2013, 1, 1)), 4)
+        self.assertEquals(store.sync(api, today=date(2013, 1, 2)), 1)
+
+        self.assertEquals(api.calls[0]['last_update'], None)
+        self.assertEquals(api.calls[0]['state'], 'VIC')
+        self.assertEquals(api.calls[1]['last_update'], date(2013, 1, 1))
+        self.assertEquals(store.last_update, date(2013, 1, 2))
+
+        self.assertEquals(len(store), 4)
+        self.assertFalse(store.get(99999992).active)
+        self.assertEquals(len(store.active_points()), 3)
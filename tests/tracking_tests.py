@@ -0,0 +1,142 @@
+import pytz
+
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+from auspost import common
+from auspost.tracking import TrackingWatcher, get_event_key
+from auspost.delivery_choice import (DeliveryChoiceApi, TrackingResult,
+                                     Article, Event)
+
+
+NOW = pytz.utc.localize(datetime(2013, 3, 1, 12, 0))
+
+
+class FakeTrackingApi(object):
+    MAX_TRACKING_IDS = DeliveryChoiceApi.MAX_TRACKING_IDS
+
+    def __init__(self):
+        self.requests = []
+        self.articles = {}
+        self.fail = set()
+        # IDs left out of successful responses
+        self.missing = set()
+
+    def iter_query_tracking(self, tracking_ids, max_workers=4):
+        for chunk in common.chunked(tracking_ids, self.MAX_TRACKING_IDS):
+            self.requests.append(chunk)
+            if self.fail.intersection(chunk):
+                yield chunk, None, common.AusPostHttpException(503)
+                continue
+
+            results = []
+            for tracking_id in chunk:
+                if tracking_id in self.missing:
+                    continue
+                status, events = self.articles.get(tracking_id, (None, []))
+                results.append(TrackingResult(tracking_id, article=Article(
+                    tracking_id, status=status, events=list(events))))
+            yield chunk, results, None
+
+
+def create_event(hours_ago, description='In transit'):
+    return Event(description, NOW - timedelta(hours=hours_ago), 'MELBOURNE')
+
+
+class TestTrackingWatcher(TestCase):
+
+    def setUp(self):
+        self.api = FakeTrackingApi()
+        self.watcher = TrackingWatcher(self.api)
+
+    def test_due_ids_are_packed_into_full_requests(self):
+        for i in range(13):
+            self.watcher.watch('ID%02d' % i, next_poll=NOW)
+        for i in range(13, 20):
+            self.watcher.watch(
+                'ID%02d' % i, next_poll=NOW + timedelta(minutes=10 + i))
+        self.watcher.watch('LATER', next_poll=NOW + timedelta(hours=2))
+
+        due = self.watcher.get_due(NOW)
+        self.assertEquals(due, ['ID%02d' % i for i in range(20)])
+
+    def test_only_new_events_are_returned(self):
+        self.watcher.watch('A', next_poll=NOW)
+        self.api.articles['A'] = ('In transit', [create_event(2)])
+
+        updates, errors = self.watcher.poll(NOW)
+        self.assertEquals(len(updates), 1)
+        self.assertEquals(len(updates[0][1]), 1)
+
+        later = NOW + timedelta(hours=1)
+        self.api.articles['A'] = (
+            'In transit', [create_event(0, 'Onboard'), create_event(2)])
+        updates, errors = self.watcher.poll(later)
+        self.assertEquals(
+            [e.description for e in updates[0][1]], ['Onboard'])
+
+        updates, errors = self.watcher.poll(later + timedelta(hours=1))
+        self.assertEquals(updates, [])
+
+    def test_poll_interval_depends_on_event_age(self):
+        self.watcher.watch('RECENT', next_poll=NOW)
+        self.watcher.watch('IDLE', next_poll=NOW)
+        self.watcher.watch('NONE', next_poll=NOW)
+        self.api.articles['RECENT'] = ('In transit', [create_event(2)])
+        self.api.articles['IDLE'] = ('In transit', [create_event(24 * 5)])
+
+        self.watcher.poll(NOW)
+        next_polls = dict(
+            (i, self.watcher._articles[i].next_poll - NOW)
+            for i in ['RECENT', 'IDLE', 'NONE'])
+        self.assertEquals(next_polls, {
+            'RECENT': timedelta(hours=1),
+            'IDLE': timedelta(hours=12),
+            'NONE': timedelta(days=1)})
+
+        self.assertEquals(self.watcher.get_due(NOW + timedelta(minutes=1)), [])
+        self.assertEquals(
+            self.watcher.get_due(NOW + timedelta(hours=1)), ['RECENT'])
+
+    def test_delivered_and_idle_articles_are_dropped(self):
+        self.watcher.watch('DELIVERED', next_poll=NOW)
+        self.watcher.watch('IDLE', next_poll=NOW)
+        self.api.articles['DELIVERED'] = ('Delivered', [create_event(1)])
+        self.api.articles['IDLE'] = ('In transit', [create_event(24 * 40)])
+
+        updates, errors = self.watcher.poll(NOW)
+        self.assertEquals(len(updates), 2)
+        self.assertEquals(len(self.watcher), 0)
+
+    def test_failed_requests_are_retried(self):
+        self.watcher.watch('A', next_poll=NOW)
+        self.api.fail.add('A')
+
+        updates, errors = self.watcher.poll(NOW)
+        self.assertEquals(errors[0][0], ['A'])
+        self.assertEquals(
+            self.watcher.get_due(NOW + timedelta(minutes=15)), ['A'])
+
+    def test_ids_missing_from_response_are_polled_again(self):
+        self.watcher.watch('NOW', next_poll=NOW)
+        self.watcher.watch('SOON', next_poll=NOW + timedelta(minutes=10))
+        self.api.missing.update(['NOW', 'SOON'])
+
+        self.watcher.poll(NOW)
+        self.assertEquals(self.api.requests, [['NOW', 'SOON']])
+        self.assertEquals(
+            sorted(self.watcher.get_due(
+                NOW + self.watcher.default_poll_interval)),
+            ['NOW', 'SOON'])
+
+    def test_rewatched_ids_are_only_due_once(self):
+        self.watcher.watch('A', next_poll=NOW)
+        self.watcher.unwatch('A')
+        self.watcher.watch('A', next_poll=NOW)
+        self.assertEquals(self.watcher.get_due(NOW), ['A'])
+
+    def test_events_are_compared_by_value(self):
+        event = create_event(2)
+        self.assertEquals(
+            get_event_key(event),
+            (NOW - timedelta(hours=2), 'In transit', 'MELBOURNE'))
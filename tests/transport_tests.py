@@ -0,0 +1,171 @@
+import threading
+
+from unittest import TestCase
+
+from auspost import common
+from auspost.transport import (RateLimiter, RetryPolicy, CircuitBreaker,
+                               SingleFlight)
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestRateLimiter(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(rate=10, burst=2)
+        self.limiter._time = self.clock.time
+        self.limiter._sleep = self.clock.sleep
+        self.limiter._updated = self.clock.now
+
+    def test_requests_are_delayed_after_burst(self):
+        for i in range(4):
+            self.limiter.acquire()
+        self.assertEquals(len(self.clock.sleeps), 2)
+        self.assertAlmostEqual(self.clock.now, 1000.2)
+
+    def test_rates_below_one_request_per_second_are_allowed(self):
+        limiter = RateLimiter(rate=0.5)
+        limiter._time = self.clock.time
+        limiter._sleep = self.clock.sleep
+        limiter._updated = self.clock.now
+
+        for i in range(3):
+            limiter.acquire()
+        self.assertEquals(len(self.clock.sleeps), 2)
+        self.assertAlmostEqual(self.clock.now, 1004.0)
+
+    def test_rate_adapts_to_throttling(self):
+        self.limiter.throttled()
+        self.limiter.throttled()
+        self.assertEquals(self.limiter.current_rate, 2.5)
+
+        for i in range(10):
+            self.limiter.succeeded()
+        self.assertAlmostEqual(self.limiter.current_rate, 3.5)
+
+        for i in range(10):
+            self.limiter.throttled()
+        self.assertEquals(self.limiter.current_rate, 1.0)
+
+
+class TestRetryPolicy(TestCase):
+
+    def test_backoff_is_jittered_and_capped(self):
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5)
+        for retry in range(6):
+            backoff = policy.get_backoff(retry)
+            self.assertTrue(0 <= backoff <= min(5, 2 ** retry))
+
+    def test_retry_after_header_is_respected(self):
+        class Response(object):
+            headers = {'Retry-After': '3'}
+
+        policy = RetryPolicy(backoff_factor=0.01)
+        self.assertEquals(policy.get_backoff(0, Response()), 3.0)
+
+
+class TestCircuitBreaker(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10)
+        self.breaker._time = self.clock.time
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEquals(self.breaker.state, CircuitBreaker.CLOSED)
+
+        self.breaker.record_failure()
+        self.assertEquals(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertRaises(
+            common.AusPostCircuitOpenException, self.breaker.before_request)
+
+    def test_single_trial_request_after_recovery_timeout(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 10
+
+        self.breaker.before_request()
+        self.assertRaises(
+            common.AusPostCircuitOpenException, self.breaker.before_request)
+
+        self.breaker.record_failure()
+        self.assertEquals(self.breaker.state, CircuitBreaker.OPEN)
+
+        self.clock.now += 10
+        self.breaker.before_request()
+        self.breaker.record_success()
+        self.assertEquals(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+class TestSingleFlight(TestCase):
+
+    def run_concurrently(self, func, count=5):
+        self.single_flight = SingleFlight()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        results = []
+
+        def call():
+            try:
+                results.append(self.single_flight.do('key', func))
+            except Exception as exc:
+                results.append(exc)
+
+        threads = [threading.Thread(target=call) for i in range(count)]
+        threads[0].start()
+        self.started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+
+        # wait for all followers to block on the call in flight
+        while self.single_flight.shared < count - 1:
+            self.release.wait(0.001)
+        self.release.set()
+
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_concurrent_calls_share_result(self):
+        calls = []
+
+        def func():
+            calls.append(1)
+            self.started.set()
+            self.release.wait(5)
+            return 'result'
+
+        results = self.run_concurrently(func)
+        self.assertEquals(len(calls), 1)
+        self.assertEquals(sorted(results), [('result', False)] +
+                          [('result', True)] * 4)
+
+    def test_concurrent_calls_share_exception(self):
+        def func():
+            self.started.set()
+            self.release.wait(5)
+            raise common.AusPostException(1503)
+
+        results = self.run_concurrently(func)
+        self.assertEquals([exc.code for exc in results], [1503] * 5)
+
+    def test_sequential_calls_are_not_shared(self):
+        single_flight = SingleFlight()
+        self.assertEquals(single_flight.do('key', lambda: 1), (1, False))
+        self.assertEquals(single_flight.do('key', lambda: 2), (2, False))